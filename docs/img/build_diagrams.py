@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Build every animated diagram in docs/img whose spec or generator changed.
+
+Diagram specs are the *.diagram.json / .yaml / .yml files under the root directory (this
+script's by default); each one is generated next to itself, as gen_distributed_scaling does.
+MANIFEST records the hashes of each spec, of the generator code and of the SVG written from
+them, so a build only regenerates diagrams whose inputs changed (or whose SVG was edited or
+deleted), across a process pool. --watch keeps the generator loaded and polls for edits:
+a changed spec is rebuilt in-process, and a changed generator module is reloaded first.
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import diagram_layout
+import gen_distributed_scaling
+import topology_sim
+
+ROOT = Path(__file__).parent
+MANIFEST = ".diagram-build.json"
+GENERATOR_MODULES = (diagram_layout, topology_sim, gen_distributed_scaling)  # in reload order
+WATCH_INTERVAL = 0.05  # seconds between polls
+MAX_WORKERS = 61  # ProcessPoolExecutor's limit on Windows
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def generator_hash():
+    return digest(b"".join(Path(module.__file__).read_bytes() for module in GENERATOR_MODULES))
+
+
+def find_specs(root):
+    return sorted(p for suffix in gen_distributed_scaling.SPEC_SUFFIXES for p in root.rglob(f"*{suffix}"))
+
+
+def load_manifest(root):
+    path = root / MANIFEST
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+
+def save_manifest(root, manifest):
+    (root / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def is_stale(spec_path, entry, generator):
+    out = gen_distributed_scaling.default_output(spec_path)
+    return (
+        entry is None
+        or entry["spec"] != digest(spec_path.read_bytes())
+        or entry["generator"] != generator
+        or not out.exists()
+        or entry["output"] != digest(out.read_bytes())
+    )
+
+
+def build(spec_path):
+    """Generates one diagram; returns (manifest entry or None, problems, ms)."""
+    g = gen_distributed_scaling
+    started = time.perf_counter()
+    spec_path = Path(spec_path)
+    out = g.default_output(spec_path)
+    try:
+        spec_bytes = spec_path.read_bytes()
+        spec = g.with_timings(g.layout_spec(g.load_spec(spec_path)))
+        topo, anims, _, svg = g.generate(spec, out)
+        problems = g.check_diagram(topo, anims, svg)
+    except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+        problems = [f"{type(e).__name__}: {e}"]
+    except SystemExit as e:  # load_spec's missing-PyYAML message
+        problems = [str(e)]
+    if problems:
+        return None, problems, (time.perf_counter() - started) * 1000
+    data = svg.encode()
+    if not out.exists() or out.read_bytes() != data:
+        out.write_bytes(data)
+    entry = {"spec": digest(spec_bytes), "generator": generator_hash(), "output": digest(data)}
+    return entry, [], (time.perf_counter() - started) * 1000
+
+
+def report(root, spec_path, entry, problems, ms):
+    name = spec_path.relative_to(root)
+    for problem in problems:
+        print(f"error: {name}: {problem}", file=sys.stderr)
+    if entry:
+        print(f"Built {gen_distributed_scaling.default_output(spec_path).relative_to(root)} in {ms:.0f} ms")
+
+
+def build_all(root, force=False, jobs=None):
+    """Regenerates the stale diagrams in parallel; returns whether all of them passed check_diagram."""
+    manifest = load_manifest(root)
+    generator = generator_hash()
+    specs = find_specs(root)
+    stale = [p for p in specs if force or is_stale(p, manifest.get(str(p.relative_to(root))), generator)]
+    if len(stale) > 1 and jobs != 1:
+        with ProcessPoolExecutor(min(jobs or os.cpu_count() or 1, len(stale), MAX_WORKERS)) as pool:
+            results = list(pool.map(build, stale))
+    else:
+        results = [build(p) for p in stale]
+    ok = True
+    for spec_path, (entry, problems, ms) in zip(stale, results):
+        report(root, spec_path, entry, problems, ms)
+        key = str(spec_path.relative_to(root))
+        if entry:
+            manifest[key] = entry
+        else:
+            manifest.pop(key, None)
+            ok = False
+    for key in set(manifest) - {str(p.relative_to(root)) for p in specs}:
+        del manifest[key]
+    save_manifest(root, manifest)
+    print(f"{len(specs) - len(stale)} of {len(specs)} diagrams up to date")
+    return ok
+
+
+def watch(root, jobs=None):
+    build_all(root, jobs=jobs)
+    sources = [Path(module.__file__) for module in GENERATOR_MODULES]
+    seen = {}
+
+    def changed(paths):
+        mtimes = {p: p.stat().st_mtime_ns for p in paths if p.exists()}
+        edited = [p for p, mtime in mtimes.items() if seen.get(p) != mtime]
+        seen.update(mtimes)
+        return edited
+
+    changed([*sources, *find_specs(root)])
+    print(f"Watching {root} (Ctrl+C to stop)")
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        specs = find_specs(root)
+        edited = changed(specs)
+        if changed(sources):
+            try:
+                for module in GENERATOR_MODULES:
+                    importlib.reload(module)
+            except Exception as e:  # a half-saved module must not end the watch
+                print(f"error: reloading the generator: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            edited = specs
+        if not edited:
+            continue
+        manifest = load_manifest(root)
+        for spec_path in edited:
+            entry, problems, ms = build(spec_path)
+            report(root, spec_path, entry, problems, ms)
+            if entry:
+                manifest[str(spec_path.relative_to(root))] = entry
+            else:
+                manifest.pop(str(spec_path.relative_to(root)), None)
+        save_manifest(root, manifest)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Regenerate the animated diagrams whose spec or generator changed")
+    parser.add_argument("root", type=Path, nargs="?", default=ROOT, help="directory searched for diagram specs")
+    parser.add_argument("--force", action="store_true", help="rebuild every diagram")
+    parser.add_argument("--jobs", type=int, help="build processes (default: one per CPU)")
+    parser.add_argument("--watch", action="store_true", help="keep rebuilding diagrams as their specs or the generator change")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    root = args.root.resolve()
+    if args.watch:
+        try:
+            watch(root, args.jobs)
+        except KeyboardInterrupt:
+            pass
+        return
+    if not build_all(root, args.force, args.jobs):
+        raise SystemExit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Static frames of an animated diagram, for reduced motion, social previews and low-power clients.
+
+KeyframeSampler evaluates the generated keyframe tables at any time of the cycle, for all
+elements at once: per property, the stops of every element are padded into one array, so a
+sample is a few NumPy operations plus the CSS ease curve. render_frame() draws the diagram's
+static markup with the sampled state using Pillow, and export_frames() renders many frames
+across a process pool. No browser is involved.
+"""
+
+import math
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from gen_distributed_scaling import merge_stops
+
+COLOR_PROPERTIES = ("fill", "stroke")
+NUMBER_PROPERTIES = ("stroke-width", "opacity", "transform")
+EASE = (0.25, 0.1, 0.25, 1.0)  # cubic-bezier of the "ease" timing function
+SUPERSAMPLE = 2
+SVG_NS = "{http://www.w3.org/2000/svg}"
+FONTS = ("Inter.ttf", "DejaVuSans.ttf", "Arial.ttf")  # the diagram's font stack, as far as it's installed
+
+
+def parse_color(value):
+    value = value.strip()
+    if value.startswith("#") and len(value) == 4:
+        value = "#" + "".join(c * 2 for c in value[1:])
+    if value.startswith("#") and len(value) == 7:
+        return tuple(int(value[i:i + 2], 16) for i in (1, 3, 5))
+    return {"white": (255, 255, 255), "black": (0, 0, 0)}.get(value)
+
+
+def parse_number(prop, value):
+    if prop == "transform":
+        match = re.fullmatch(r"translateY\((-?[\d.]+)(?:px)?\)", value.strip())
+        if not match:
+            raise ValueError(f"unsupported animated transform {value!r}")
+        return float(match[1])
+    return float(value)
+
+
+def _ease_table(samples=2048):
+    u = np.linspace(0.0, 1.0, samples)
+    x1, y1, x2, y2 = EASE
+    bezier = lambda p1, p2: 3 * (1 - u) ** 2 * u * p1 + 3 * (1 - u) * u ** 2 * p2 + u ** 3
+    return bezier(x1, x2), bezier(y1, y2)
+
+
+class KeyframeSampler:
+    """Interpolated fill, stroke, stroke-width, opacity and translateY of every animated element at a time t."""
+
+    def __init__(self, anims, dur):
+        self.dur = dur
+        self.ease_x, self.ease_y = _ease_table()
+        tracks = {}
+        for _kind, element_id, _name, stops in anims:
+            merged = merge_stops(stops)
+            for prop in COLOR_PROPERTIES + NUMBER_PROPERTIES:
+                points = [(pct, props[prop]) for pct, props in merged if prop in props]
+                if points:
+                    tracks.setdefault(prop, []).append((element_id, points))
+        self.tracks = {prop: self._pack(prop, entries) for prop, entries in tracks.items()}
+
+    @staticmethod
+    def _pack(prop, entries):
+        """Element ids, plus stop % and values padded to one (elements, stops) array per property.
+
+        A property missing at 0% or 100% keeps its nearest value there; it is only ever missing
+        while the element is invisible.
+        """
+        width = max(len(points) for _, points in entries) + 2
+        pcts = np.empty((len(entries), width))
+        values = np.empty((len(entries), width, 3 if prop in COLOR_PROPERTIES else 1))
+        for row, (_, points) in enumerate(entries):
+            parsed = [parse_color(v) if prop in COLOR_PROPERTIES else (parse_number(prop, v),) for _, v in points]
+            row_pcts = [0, *(p for p, _ in points), 100]
+            row_values = [parsed[0], *parsed, parsed[-1]]
+            pcts[row] = row_pcts + [100] * (width - len(row_pcts))
+            values[row] = row_values + [row_values[-1]] * (width - len(row_values))
+        return [element_id for element_id, _ in entries], pcts, values
+
+    def sample(self, t):
+        """element id → {property: value}; colors are RGB tuples, translateY is "transform"."""
+        phase = (t % self.dur) / self.dur * 100
+        state = {}
+        for prop, (ids, pcts, values) in self.tracks.items():
+            last = pcts.shape[1] - 2
+            i = np.clip((pcts <= phase).sum(axis=1) - 1, 0, last)
+            rows = np.arange(len(ids))
+            a, b = pcts[rows, i], pcts[rows, i + 1]
+            progress = np.where(b > a, np.clip((phase - a) / np.where(b > a, b - a, 1), 0, 1), 1.0)
+            eased = np.interp(progress, self.ease_x, self.ease_y)[:, None]
+            sampled = values[rows, i] + (values[rows, i + 1] - values[rows, i]) * eased
+            if prop in COLOR_PROPERTIES:
+                for element_id, rgb in zip(ids, np.round(sampled).astype(int).tolist()):
+                    state.setdefault(element_id, {})[prop] = tuple(rgb)
+            else:
+                for element_id, (value,) in zip(ids, sampled.tolist()):
+                    state.setdefault(element_id, {})[prop] = value
+        return state
+
+
+# ═══════════════════════════════════════════
+# RASTERIZATION
+# ═══════════════════════════════════════════
+
+def _css_classes(css):
+    classes = {}
+    for name, body in re.findall(r"\.([\w-]+)\s*\{([^}]*)\}", css):
+        classes[name] = {k.strip(): v.strip() for k, v in (d.split(":", 1) for d in body.split(";") if ":" in d)}
+    return classes
+
+
+def _gradient_colors(root):
+    """Gradient id → its average color and opacity; frames fill gradients flat."""
+    colors = {}
+    for gradient in root.iter(SVG_NS + "linearGradient"):
+        stops = [(parse_color(s.get("stop-color")), float(s.get("stop-opacity", 1))) for s in gradient.iter(SVG_NS + "stop")]
+        rgb = tuple(round(sum(c[i] for c, _ in stops) / len(stops)) for i in range(3))
+        colors[gradient.get("id")] = (rgb, sum(o for _, o in stops) / len(stops))
+    return colors
+
+
+def _markers(root):
+    markers = {}
+    for marker in root.iter(SVG_NS + "marker"):
+        _, _, view_w, _ = (float(v) for v in marker.get("viewBox").split())
+        path = marker.find(SVG_NS + "path")
+        points = [(float(x), float(y)) for x, y in re.findall(r"(-?[\d.]+)\s+(-?[\d.]+)", path.get("d"))]
+        ref = float(marker.get("refX", 0)), float(marker.get("refY", 0))
+        markers[marker.get("id")] = (points, ref, float(marker.get("markerWidth", 3)) / view_w, parse_color(path.get("fill")))
+    return markers
+
+
+def display_list(svg):
+    """The drawable elements of a static SVG in paint order, each with its attributes and the ids of its groups."""
+    root = ET.fromstring(svg)
+    style = root.find(f"{SVG_NS}defs/{SVG_NS}style")
+    context = {
+        "size": tuple(float(v) for v in root.get("viewBox").split()[2:]),
+        "classes": _css_classes(style.text if style is not None and style.text else ""),
+        "gradients": _gradient_colors(root),
+        "markers": _markers(root),
+    }
+    items = []
+
+    def walk(element, groups):
+        for child in element:
+            tag = child.tag.removeprefix(SVG_NS)
+            if tag == "defs":
+                continue
+            if tag == "g":
+                walk(child, groups + [child])
+            elif tag in ("rect", "line", "circle", "text"):
+                items.append((tag, dict(child.attrib), child.text, [dict(g.attrib) for g in groups]))
+    walk(root, [])
+    return context, items
+
+
+def _rgba(color, opacity, gradients):
+    if color is None or color == "none":
+        return None
+    if isinstance(color, str) and color.startswith("url(#"):
+        color, gradient_opacity = gradients[color[5:-1]]
+        opacity *= gradient_opacity
+    elif isinstance(color, str):
+        color = parse_color(color)
+    return (*color, round(255 * max(0.0, min(1.0, opacity))))
+
+
+def _dashed(x1, y1, x2, y2, pattern):
+    length = math.hypot(x2 - x1, y2 - y1)
+    if not pattern or length == 0:
+        yield x1, y1, x2, y2
+        return
+    position, on, i = 0.0, True, 0
+    while position < length:
+        step = min(pattern[i % len(pattern)], length - position)
+        if on:
+            a, b = position / length, (position + step) / length
+            yield x1 + (x2 - x1) * a, y1 + (y2 - y1) * a, x1 + (x2 - x1) * b, y1 + (y2 - y1) * b
+        position, on, i = position + step, not on, i + 1
+
+
+def _font(image_font, size):
+    for name in FONTS:
+        try:
+            return image_font.truetype(name, size)
+        except OSError:
+            pass
+    try:
+        return image_font.load_default(size)
+    except TypeError:  # Pillow < 10.1 has a single bitmap size
+        return image_font.load_default()
+
+
+def render_frame(context, items, state, width):
+    """A PIL image of the display list with the sampled animation state applied."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    svg_w, svg_h = context["size"]
+    scale = width / svg_w * SUPERSAMPLE
+    image = Image.new("RGB", (round(svg_w * scale), round(svg_h * scale)), "white")
+    draw = ImageDraw.Draw(image, "RGBA")
+    fonts = {}
+
+    for tag, attrs, text, groups in items:
+        # Presentation attributes < class styles < animations; groups pass theirs down
+        props, opacity, dx, dy = {}, 1.0, 0.0, 0.0
+        for source in [*groups, attrs]:
+            animated = state.get(source.get("id"), {})
+            resolved = {**source, **context["classes"].get(source.get("class"), {}), **animated}
+            for prop in ("fill", "stroke", "stroke-width", "stroke-dasharray", "stroke-linecap", "marker-end",
+                         "font-size", "text-anchor", "text-transform"):
+                if prop in resolved:
+                    props[prop] = resolved[prop]
+            opacity *= float(resolved.get("opacity", 1))
+            translate = re.match(r"translate\((-?[\d.]+),\s*(-?[\d.]+)\)", source.get("transform", ""))
+            if translate:
+                dx, dy = dx + float(translate[1]), dy + float(translate[2])
+            dy += animated.get("transform", 0.0)
+        if opacity <= 0.004:
+            continue
+        fill = _rgba(props.get("fill", "none" if tag == "line" else (0, 0, 0)), opacity, context["gradients"])
+        stroke = _rgba(props.get("stroke"), opacity, context["gradients"])
+        stroke_w = float(props.get("stroke-width", 1)) * scale
+        at = lambda x, y: ((float(x) + dx) * scale, (float(y) + dy) * scale)
+
+        if tag in ("rect", "circle"):
+            if tag == "rect":
+                x0, y0 = at(attrs.get("x", 0), attrs.get("y", 0))
+                x1, y1 = x0 + float(attrs["width"]) * scale, y0 + float(attrs["height"]) * scale
+                radius = float(attrs.get("rx", 0)) * scale
+            else:
+                cx, cy = at(attrs["cx"], attrs["cy"])
+                r = float(attrs["r"]) * scale
+                x0, y0, x1, y1, radius = cx - r, cy - r, cx + r, cy + r, r
+            # SVG strokes straddle the outline, so the fill stops half a stroke inside it
+            inset = stroke_w / 2 if stroke else 0
+            shape = draw.ellipse if tag == "circle" else lambda box, **kw: draw.rounded_rectangle(box, radius, **kw)
+            if fill:
+                shape((x0 + inset, y0 + inset, x1 - inset, y1 - inset), fill=fill)
+            if stroke:
+                outer = (x0 - inset, y0 - inset, x1 + inset, y1 + inset)
+                if tag == "rect":
+                    draw.rounded_rectangle(outer, radius + inset, outline=stroke, width=max(1, round(stroke_w)))
+                else:
+                    draw.ellipse(outer, outline=stroke, width=max(1, round(stroke_w)))
+        elif tag == "line" and stroke:
+            x1, y1 = at(attrs["x1"], attrs["y1"])
+            x2, y2 = at(attrs["x2"], attrs["y2"])
+            pattern = [float(v) * scale for v in re.split(r"[,\s]+", props.get("stroke-dasharray", "").strip()) if v]
+            for segment in _dashed(x1, y1, x2, y2, pattern):
+                draw.line(segment, fill=stroke, width=max(1, round(stroke_w)))
+                if props.get("stroke-linecap") == "round":
+                    for x, y in (segment[:2], segment[2:]):
+                        draw.ellipse((x - stroke_w / 2, y - stroke_w / 2, x + stroke_w / 2, y + stroke_w / 2), fill=stroke)
+            marker = re.fullmatch(r"url\(#([\w-]+)\)", props.get("marker-end", ""))
+            if marker and marker[1] in context["markers"]:
+                points, (ref_x, ref_y), unit, color = context["markers"][marker[1]]
+                size = unit * stroke_w
+                angle = math.atan2(y2 - y1, x2 - x1)
+                cos, sin = math.cos(angle), math.sin(angle)
+                polygon = [(x2 + ((px - ref_x) * cos - (py - ref_y) * sin) * size,
+                            y2 + ((px - ref_x) * sin + (py - ref_y) * cos) * size) for px, py in points]
+                draw.polygon(polygon, fill=_rgba(color, opacity, context["gradients"]))
+        elif tag == "text" and text and fill:
+            size = round(float(re.sub(r"px$", "", props.get("font-size", "16"))) * scale)
+            if size not in fonts:
+                fonts[size] = _font(ImageFont, size)
+            anchor = {"middle": "ms", "end": "rs"}.get(props.get("text-anchor"), "ls")
+            if props.get("text-transform") == "uppercase":
+                text = text.upper()
+            draw.text(at(attrs.get("x", 0), attrs.get("y", 0)), text, fill=fill, font=fonts[size], anchor=anchor)
+
+    return image.resize((round(svg_w * scale / SUPERSAMPLE), round(svg_h * scale / SUPERSAMPLE)), Image.LANCZOS)
+
+
+# ═══════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════
+
+_worker = {}
+
+
+def _init_worker(svg, anims, dur, width):
+    _worker["context"], _worker["items"] = display_list(svg)
+    _worker["sampler"] = KeyframeSampler(anims, dur)
+    _worker["width"] = width
+
+
+def _render(job):
+    t, path = job
+    state = _worker["sampler"].sample(t)
+    render_frame(_worker["context"], _worker["items"], state, _worker["width"]).save(path)
+    return path
+
+
+def export_frames(svg, anims, dur, count, out_dir, width, workers=None, apng=None):
+    """Renders count evenly spaced frames of the cycle to PNG files; optionally joins them into a looping APNG."""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise SystemExit("frame export requires Pillow (pip install pillow)")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [(i * dur / count, out_dir / f"frame-{i:04d}.png") for i in range(count)]
+    workers = min(workers or os.cpu_count() or 1, count)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(svg, anims, dur, width)) as pool:
+        paths = list(pool.map(_render, jobs, chunksize=max(1, count // (workers * 4))))
+    if apng:
+        from PIL import Image
+        frames = [Image.open(path) for path in paths]
+        frames[0].save(apng, save_all=True, append_images=frames[1:], duration=round(dur * 1000 / count), loop=0)
+    return paths
@@ -0,0 +1,150 @@
+"""Layered placement of the nodes inside each host box, and bulk node and edge geometry.
+
+Nodes are layered by their longest path from the host's entry nodes, left to right, with DB nodes
+in a last layer of their own right of the partition line. Within each layer they are ordered
+by barycenter sweeps to reduce edge crossings. Every step works on all hosts at once, so large
+topologies cost a few NumPy passes rather than a Python loop per node.
+"""
+
+import numpy as np
+
+SWEEPS = 8
+DB_FX = 0.82  # DB layer, right of the partition line
+APP_FX = (0.12, 0.52)  # other layers of a host with DB nodes
+FX = (0.1, 0.9)
+
+
+def _flatten(hosts):
+    """Node counts per host, internal edges as global node ids, and the DB node mask."""
+    counts = np.array([h["nodes"] if isinstance(h["nodes"], int) else len(h["nodes"]) for h in hosts], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    edges = [np.asarray(h["edges"], dtype=np.int64).reshape(-1, 2) + offset for h, offset in zip(hosts, offsets)]
+    edges = np.concatenate(edges) if edges else np.zeros((0, 2), dtype=np.int64)
+    db = np.zeros(counts.sum(), dtype=bool)
+    for h, offset in zip(hosts, offsets):
+        db[np.asarray(h.get("db", ()), dtype=np.int64) + offset] = True
+    return counts, edges, db
+
+
+def _layers(host_of, edges, db, max_depth):
+    src, dst = edges[:, 0], edges[:, 1]
+    layer = np.zeros(len(host_of), dtype=np.int64)
+    for _ in range(max_depth + 1):
+        relaxed = layer.copy()
+        np.maximum.at(relaxed, dst, layer[src] + 1)
+        if np.array_equal(relaxed, layer):
+            break
+        layer = relaxed
+    else:
+        raise ValueError("host edges contain a cycle")
+    # DB nodes get a layer of their own, after every other node of their host
+    last = np.full(host_of.max(initial=0) + 1, -1, dtype=np.int64)
+    np.maximum.at(last, host_of[~db], layer[~db])
+    layer[db] = last[host_of[db]] + 1
+    return layer
+
+
+def _group_ranks(keys, order):
+    """Rank of each node within its group of equal keys, given an order sorted by key first."""
+    sorted_keys = keys[order]
+    starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+    first = np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order)) - first
+    return ranks
+
+
+def _inversions(values):
+    """Pairs i < j with values[i] > values[j]: a bottom-up merge sort, merging every block pair at once."""
+    _, x = np.unique(values, return_inverse=True)
+    x = x.astype(np.int64).ravel()
+    n, total, width = len(x), 0, 1
+    while width < n:
+        index = np.arange(n)
+        block = index // (2 * width)
+        right = (index // width) % 2 == 1
+        # Both halves of a block are sorted; offsetting by block keeps one global sorted order
+        keys = block * n + x
+        left = keys[~right]
+        not_greater = np.searchsorted(left, keys[right], side="right")
+        in_block = np.searchsorted(left, (block[right] + 1) * n, side="left")
+        total += int((in_block - not_greater).sum())
+        x = np.sort(keys) % n
+        width *= 2
+    return total
+
+
+def count_crossings(group, rank, edges, layer):
+    """Crossings between edges joining adjacent layers of the same host."""
+    src, dst = edges[:, 0], edges[:, 1]
+    adjacent = layer[dst] == layer[src] + 1
+    if not adjacent.any():
+        return 0
+    g, s, d = group[src[adjacent]], rank[src[adjacent]], rank[dst[adjacent]]
+    # Two edges of a group cross when one leaves an earlier source for a later destination
+    order = np.lexsort((d, s, g))
+    return _inversions(g[order] * (int(d.max()) + 1) + d[order])
+
+
+def layered_layout(hosts):
+    """(frac_x, frac_y) lists per host, for host specs whose "nodes" are a count or ignored positions."""
+    counts, edges, db = _flatten(hosts)
+    host_of = np.repeat(np.arange(len(hosts)), counts)
+    layer = _layers(host_of, edges, db, int(counts.max(initial=0)))
+    layer_count = np.zeros(len(hosts), dtype=np.int64)
+    np.maximum.at(layer_count, host_of, layer + 1)
+    group = host_of * (layer.max(initial=0) + 1) + layer
+
+    # Barycenter sweeps, alternating between callers and callees, keeping the best order seen
+    index = np.arange(len(host_of))
+    rank = _group_ranks(group, np.lexsort((index, group)))
+    best, best_crossings = rank, count_crossings(group, rank, edges, layer)
+    for sweep in range(SWEEPS):
+        src, dst = (edges[:, 0], edges[:, 1]) if sweep % 2 == 0 else (edges[:, 1], edges[:, 0])
+        degree = np.bincount(dst, minlength=len(rank))
+        total = np.bincount(dst, weights=rank[src], minlength=len(rank))
+        barycenter = np.where(degree > 0, total / np.maximum(degree, 1), rank)
+        rank = _group_ranks(group, np.lexsort((rank, barycenter, group)))
+        crossings = count_crossings(group, rank, edges, layer)
+        if crossings < best_crossings:
+            best, best_crossings = rank, crossings
+
+    size = np.bincount(group, minlength=group.max(initial=0) + 1)[group]
+    fy = (best + 0.5) / size
+    has_db = np.zeros(len(hosts), dtype=bool)
+    has_db[host_of[db]] = True
+    spans = np.maximum(layer_count[host_of] - 1 - has_db[host_of], 1)
+    lo, hi = np.where(has_db[host_of], APP_FX[0], FX[0]), np.where(has_db[host_of], APP_FX[1], FX[1])
+    fx = np.where(layer_count[host_of] > 1, lo + (hi - lo) * layer / spans, 0.5)
+    fx[db] = DB_FX
+    fractions = np.round(np.stack((fx, fy), axis=1), 3).tolist()
+    bounds = np.concatenate(([0], np.cumsum(counts))).tolist()
+    return [fractions[a:b] for a, b in zip(bounds, bounds[1:])], best_crossings
+
+
+def layout_spec(spec, relayout=False):
+    """The spec itself if every node is placed, otherwise (or if asked) a copy with layered positions."""
+    todo = [hid for hid, h in spec["hosts"].items() if relayout or isinstance(h["nodes"], int)]
+    if not todo:
+        return spec
+    placed, _ = layered_layout([spec["hosts"][hid] for hid in todo])
+    hosts = dict(spec["hosts"])
+    for hid, nodes in zip(todo, placed):
+        hosts[hid] = {**hosts[hid], "nodes": nodes}
+    return {**spec, "hosts": hosts}
+
+
+def node_positions(boxes, fractions, pad, header):
+    """Absolute integer node centers from (x, y, w, h) boxes and (frac_x, frac_y) in their padded bodies."""
+    bx, by, bw, bh = boxes.T
+    x = bx + pad + fractions[:, 0] * (bw - 2 * pad)
+    y = (by + header) + pad + fractions[:, 1] * (bh - header - 2 * pad)
+    return np.stack((np.round(x), np.round(y)), axis=1).astype(np.int64)
+
+
+def trimmed_edges(start, end, r):
+    """Integer (x1, y1, x2, y2) per edge, shortened by r at both ends so it meets the node circles."""
+    d = (end - start).astype(np.float64)
+    length = np.sqrt(d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1])
+    trim = np.where(length[:, None] < 0.1, 0.0, r * d / np.where(length < 0.1, 1.0, length)[:, None])
+    return np.concatenate((np.round(start + trim), np.round(end - trim)), axis=1).astype(np.int64)
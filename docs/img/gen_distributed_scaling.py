@@ -7,9 +7,27 @@ Redesigned with:
 - Description text at bottom changing per phase
 - 48s cycle (2x slower)
 - Equal column widths with centered boxes
+
+The topology (hosts, edges, timings) comes from a diagram spec, by default
+distributed-scaling.diagram.json next to this script (YAML works if PyYAML is installed),
+or from a random synthetic topology. Node positions and timing tables the spec leaves out
+come from diagram_layout and topology_sim.
 """
 
+import argparse
+import gzip
+import json
 import math
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from diagram_layout import layout_spec, node_positions, trimmed_edges
+from topology_sim import simulate
 
 # ═══════════════════════════════════════════
 # CONSTANTS
@@ -31,252 +49,266 @@ DB_F, DB_S = "#e4ddd6", "#b0a498"
 DB_FLASH_F, DB_FLASH_S = "#f0c8a0", "#d09050"
 
 # Layout
-SVG_W, SVG_H = 870, 600
 COL_W = 280
-COL1_X, COL2_X, COL3_X = 10, 295, 580
-DIV1_X, DIV2_X = 290, 575
 BOX_W = 200
 DB_PART_FRAC = 0.62
 
+DEFAULT_SPEC = Path(__file__).with_name("distributed-scaling.diagram.json")
+SPEC_SUFFIXES = (".diagram.json", ".diagram.yaml", ".diagram.yml")
+
 def col_center(col_x):
     return col_x + COL_W // 2
 
 def box_x(col_x):
     return col_x + (COL_W - BOX_W) // 2
 
-CX = box_x(COL1_X)   # 90
-AX = box_x(COL2_X)   # 455
-BX = box_x(COL3_X)   # 820
-
-# ═══════════════════════════════════════════
-# HOST DEFINITIONS
-# ═══════════════════════════════════════════
-# nodes: [(frac_x, frac_y), ...] relative to padded box interior
-# edges: [(src, dst), ...]
-# affected: set of node indices that invalidate/recompute
-# db: set of node indices that are DB nodes
-
-HOSTS = {
-    "C1": {
-        "box": (CX, 42, BOX_W, 70), "label": "Client 1",
-        "nodes": [(0.18, 0.35), (0.52, 0.68), (0.85, 0.38)],
-        "edges": [(0, 1), (1, 2)],
-        "affected": {0, 1, 2},
-    },
-    "C2": {
-        "box": (CX, 120, BOX_W, 82), "label": "Client 2",
-        "nodes": [(0.15, 0.50), (0.50, 0.18), (0.50, 0.82), (0.85, 0.50)],
-        "edges": [(0, 1), (0, 2), (1, 3), (2, 3)],
-        "affected": {0, 1},  # partial: nodes 2,3 stay green
-    },
-    "C3": {
-        "box": (CX, 210, BOX_W, 96), "label": "Client 3",
-        "nodes": [(0.10, 0.50), (0.38, 0.20), (0.38, 0.80), (0.68, 0.50), (0.92, 0.30)],
-        "edges": [(0, 1), (0, 2), (1, 3), (2, 3), (3, 4)],
-        "affected": set(),  # not affected by this invalidation
-    },
-    "C4": {
-        "box": (CX, 330, BOX_W, 70), "label": "Client 4",
-        "nodes": [(0.18, 0.50), (0.82, 0.22), (0.82, 0.78)],
-        "edges": [(0, 1), (0, 2)],
-        "affected": {0, 1},  # partial: node 2 stays green
-    },
-    "C5": {
-        "box": (CX, 408, BOX_W, 82), "label": "Client 5",
-        "nodes": [(0.15, 0.32), (0.52, 0.25), (0.52, 0.78), (0.85, 0.58)],
-        "edges": [(0, 1), (0, 2), (1, 3)],
-        "affected": set(),  # not affected by this invalidation
-    },
-    "A1": {
-        "box": (AX, 42, BOX_W, 248), "label": "API Server 1",
-        "nodes": [(0.12, 0.20), (0.48, 0.16), (0.85, 0.18), (0.85, 0.62)],
-        "edges": [(0, 1), (1, 2), (0, 3)],
-        "affected": {0, 1, 2},
-    },
-    "A2": {
-        "box": (AX, 318, BOX_W, 172), "label": "API Server 2",
-        "nodes": [(0.12, 0.22), (0.42, 0.16), (0.42, 0.75), (0.80, 0.18), (0.80, 0.80)],
-        "edges": [(0, 1), (0, 2), (1, 3), (2, 4)],
-        "affected": {0, 1, 3},
-    },
-    "B1": {
-        "box": (BX, 42, BOX_W, 96), "label": "Backend 1",
-        "nodes": [(0.18, 0.28), (0.18, 0.72), (0.78, 0.28), (0.78, 0.72)],
-        "edges": [(0, 2), (1, 3)],
-        "affected": set(), "db": {2, 3},
-    },
-    "B2": {
-        "box": (BX, 174, BOX_W, 108), "label": "Backend 2",
-        "nodes": [(0.14, 0.22), (0.14, 0.78), (0.42, 0.50), (0.82, 0.50)],
-        "edges": [(0, 2), (1, 2), (2, 3)],
-        "affected": {0, 1, 2}, "db": {3},
-    },
-    "B3": {
-        "box": (BX, 318, BOX_W, 96), "label": "Backend 3",
-        "nodes": [(0.20, 0.28), (0.20, 0.72), (0.78, 0.28), (0.78, 0.72)],
-        "edges": [(0, 2), (1, 3)],
-        "affected": set(), "db": {2, 3},
-    },
-}
-
-# ═══════════════════════════════════════════
-# CROSS-BOX CONNECTIONS
-# ═══════════════════════════════════════════
-
-# (from_host, from_node, to_host, to_node)
-CROSS_AFFECTED = [
-    ("C1", 2, "A1", 0), ("C2", 1, "A1", 0),  # C2 partial: only node 1 connects
-    ("C4", 1, "A2", 0),
-    ("A1", 2, "B2", 0), ("A2", 3, "B2", 1),
-]
-
-CROSS_SAFE = [
-    ("C3", 4, "A1", 3),  # C3 connects to A1's safe node
-    ("C4", 2, "A2", 2),  # C4 unconnected node → A2's safe node (same as C5)
-    ("C5", 3, "A2", 2),  # C5 connects to A2's safe node
-    ("A1", 3, "B1", 0), ("A2", 4, "B3", 0),
-]
-
-# ═══════════════════════════════════════════
-# ANIMATION TIMING (% of 48s)
-# ═══════════════════════════════════════════
-
-# Invalidation start (R→L) — only affects C1, C2, C4 (C3, C5 unaffected)
-INV = {
-    "B2": 8,
-    "A1": 11, "A2": 11,
-    "C1": 14, "C2": 15, "C4": 18,
-}
-
-# Recomputation: appear (blue), green, optional cache_hits
-RECOMP = {
-    "C1": {"appear": 30, "green": 44},
-    "A1": {"appear": 32, "green": 40, "cache_hits": [52]},
-    "B2": {"appear": 34, "green": 38, "cache_hits": [66]},
-    "C2": {"appear": 50, "green": 56},
-    "C4": {"appear": 62, "green": 72},
-    "A2": {"appear": 64, "green": 70},
-}
-
-# Cross-edge disconnect/reconnect
-CROSS_DISC_RECON = {
-    ("C1", 2, "A1", 0): (14, 30),
-    ("C2", 1, "A1", 0): (15, 50),
-    ("C4", 1, "A2", 0): (18, 62),
-    ("A1", 2, "B2", 0): (11, 32),
-    ("A2", 3, "B2", 1): (11, 64),
-}
-
-# Description phases
-DESCRIPTIONS = [
-    (0, 6, "All computed values are consistent"),
-    (7, 10, "A database change in Backend 2 triggers invalidation"),
-    (11, 22, "Invalidation cascades through both API servers to Clients 1, 2, and 4"),
-    (30, 44, "Client 1 recomputes \u2014 full chain through API Server 1 to Backend 2"),
-    (50, 56, "Client 2 recomputes \u2014 API Server 1 is already computed (cache hit)"),
-    (62, 72, "Client 4 recomputes via API Server 2 \u2014 Backend 2 is already consistent (cache hit)"),
-    (78, 100, "All computed values are consistent again"),
-]
-
 # ═══════════════════════════════════════════
-# HELPERS
+# TOPOLOGY
 # ═══════════════════════════════════════════
+# Spec hosts:
+#   nodes: [(frac_x, frac_y), ...] relative to padded box interior, or a node count to lay them out automatically
+#   edges: [(src, dst), ...]
+#   affected: node indices that invalidate/recompute
+#   db: node indices that are DB nodes
+# Cross-box edges are (from_host, from_node, to_host, to_node); timings are % of the cycle.
 
-def abs_pos(host_id, node_idx):
-    h = HOSTS[host_id]
-    bx, by, bw, bh = h["box"]
-    fx, fy = h["nodes"][node_idx]
-    # Nodes live in the body area below the header bar
-    body_top = by + HDR_H
-    body_h = bh - HDR_H
-    iw, ih = bw - 2 * PAD, body_h - 2 * PAD
-    return round(bx + PAD + fx * iw), round(body_top + PAD + fy * ih)
-
-def edge_pts(h1, n1, h2, n2, r=NR):
-    x1, y1 = abs_pos(h1, n1)
-    x2, y2 = abs_pos(h2, n2)
-    dx, dy = x2 - x1, y2 - y1
-    d = math.sqrt(dx * dx + dy * dy)
-    if d < 0.1:
-        return x1, y1, x2, y2
-    return (round(x1 + r * dx / d), round(y1 + r * dy / d),
-            round(x2 - r * dx / d), round(y2 - r * dy / d))
+# Per-node invalidation stagger: rightmost affected nodes fade first
+INV_STAGGER = 2  # % gap between each depth rank
 
 def nid(host_id, node_idx):
     return f"{host_id}-{node_idx}"
 
-def is_db(host_id, node_idx):
-    return node_idx in HOSTS[host_id].get("db", set())
+def load_spec(path):
+    text = Path(path).read_text(encoding="utf-8")
+    if Path(path).suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit(f"{path}: YAML specs require PyYAML (pip install pyyaml)")
+        return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    return json.loads(text)
+
+def default_output(spec_path):
+    name = Path(spec_path).name
+    for suffix in SPEC_SUFFIXES:
+        if name.endswith(suffix):
+            return Path(spec_path).with_name(name[:-len(suffix)] + ".svg")
+    return Path(spec_path).with_suffix(".svg")
+
+
+class Topology:
+    """A diagram spec plus per-node lookup tables, built once so generation is linear in its size."""
+
+    def __init__(self, spec):
+        self.dur = spec.get("duration", DUR)
+        self.svg_w, self.svg_h = spec["canvas"]["width"], spec["canvas"]["height"]
+        self.columns = [(c["x"], c["title"]) for c in spec["columns"]]
+        self.hosts = {
+            hid: {
+                "box": tuple(h["box"]),
+                "label": h["label"],
+                "nodes": [tuple(n) for n in h["nodes"]],
+                "edges": [tuple(e) for e in h["edges"]],
+                "affected": sorted(h.get("affected", ())),
+                "db": sorted(h.get("db", ())),
+            }
+            for hid, h in spec["hosts"].items()
+        }
+        self.cross_affected = [tuple(e) for e in spec.get("crossAffected", ())]
+        self.cross_safe = [tuple(e) for e in spec.get("crossSafe", ())]
+        self.db_change = tuple(spec["dbChange"]) if spec.get("dbChange") else None
+        self.inv = dict(spec.get("invalidation", {}))
+        self.recomp = {
+            hid: (r["appear"], r["green"], r.get("cacheHits", []))
+            for hid, r in spec.get("recomputation", {}).items()
+        }
+        # Nodes that recompute at different times than their host
+        self.node_recomp_overrides = {
+            tuple(r["node"]): (r["appear"], r["green"], r.get("cacheHits", []))
+            for r in spec.get("nodeRecomputation", ())
+        }
+        self.cross_disc_recon = {
+            tuple(t["edge"]): (t["disconnect"], t["reconnect"]) for t in spec.get("crossTimings", ())
+        }
+        self.descriptions = [tuple(d) for d in spec.get("descriptions", ())]
+        self._build_indexes()
+
+    def _build_indexes(self):
+        self.pos = {}
+        self.db_nodes = set()
+        self.affected = set()
+        self.inv_pct = {}
+        self.recomp_pct = {}
+        # Nodes live in the body area below the header bar; all positions and edge ends are computed in bulk
+        keys = [(hid, idx) for hid, host in self.hosts.items() for idx in range(len(host["nodes"]))]
+        boxes = np.array([host["box"] for host in self.hosts.values() for _ in host["nodes"]], dtype=np.float64)
+        fractions = np.array([node for host in self.hosts.values() for node in host["nodes"]], dtype=np.float64)
+        xy = node_positions(boxes.reshape(-1, 4), fractions.reshape(-1, 2), PAD, HDR_H)
+        self.pos = dict(zip(keys, map(tuple, xy.tolist())))
+        index = {key: i for i, key in enumerate(keys)}
+        edges = [(hid, src, hid, dst) for hid, host in self.hosts.items() for src, dst in host["edges"]]
+        edges += self.cross_affected + self.cross_safe
+        ends = np.array([(index[e[:2]], index[e[2:]]) for e in edges], dtype=np.int64).reshape(-1, 2)
+        self.edge_ends = dict(zip(edges, map(tuple, trimmed_edges(xy[ends[:, 0]], xy[ends[:, 1]], NR).tolist())))
+        for hid, host in self.hosts.items():
+            self.db_nodes.update((hid, idx) for idx in host["db"])
+            self.affected.update((hid, idx) for idx in host["affected"])
+            if hid in self.recomp:
+                for idx in host["affected"]:
+                    self.recomp_pct[(hid, idx)] = self.node_recomp_overrides.get((hid, idx), self.recomp[hid])
+            if hid in self.inv:
+                # Invalidation is staggered R→L by x-position, and ends before the host's edges reconnect
+                ranked = sorted(host["affected"], key=lambda i: host["nodes"][i][0], reverse=True)
+                stagger = INV_STAGGER
+                if hid in self.recomp and len(ranked) > 1:
+                    first_app = min(self.recomp_pct[(hid, idx)][0] for idx in ranked)
+                    stagger = max(0, min(INV_STAGGER, (first_app - 2 - self.inv[hid]) // (len(ranked) - 1)))
+                for rank, idx in enumerate(ranked):
+                    self.inv_pct[(hid, idx)] = self.inv[hid] + rank * stagger
+
+    def abs_pos(self, host_id, node_idx):
+        return self.pos[(host_id, node_idx)]
+
+    def edge_pts(self, h1, n1, h2, n2):
+        return self.edge_ends[(h1, n1, h2, n2)]
+
+    def is_db(self, host_id, node_idx):
+        return (host_id, node_idx) in self.db_nodes
+
+    def is_affected(self, host_id, node_idx):
+        return (host_id, node_idx) in self.affected
+
+    def is_edge_animated(self, host_id, src, dst):
+        """Edge animates if source is affected."""
+        return (host_id, src) in self.affected
+
+    def node_inv_pct(self, hid, idx):
+        """Invalidation start % for a node, staggered R→L by x-position."""
+        return self.inv_pct[(hid, idx)]
+
+    def node_recomp(self, hid, idx):
+        """Return (appear, green, cache_hits) for a node, overrides included."""
+        return self.recomp_pct[(hid, idx)]
 
-def is_affected(host_id, node_idx):
-    return node_idx in HOSTS[host_id].get("affected", set())
-
-def is_edge_animated(host_id, src, dst):
-    """Edge animates if source is affected."""
-    return is_affected(host_id, src)
-
-# Per-node invalidation stagger: rightmost affected nodes fade first
-INV_STAGGER = 2  # % gap between each depth rank
-
-def node_inv_pct(hid, idx):
-    """Invalidation start % for a node, staggered R→L by x-position."""
-    host = HOSTS[hid]
-    base = INV[hid]
-    ranked = sorted(host["affected"], key=lambda i: host["nodes"][i][0], reverse=True)
-    rank = ranked.index(idx)
-    return base + rank * INV_STAGGER
-
-# Per-node recomputation overrides (nodes that recompute at different times than their host)
-NODE_RECOMP = {
-    ("B2", 1): {"appear": 66, "green": 70},  # only when A2 requests it
-}
+# ═══════════════════════════════════════════
+# SYNTHETIC TOPOLOGIES
+# ═══════════════════════════════════════════
 
-def node_recomp(hid, idx):
-    """Return (appear, green, cache_hits) for a node, checking overrides first."""
-    override = NODE_RECOMP.get((hid, idx))
-    if override:
-        return override["appear"], override["green"], override.get("cache_hits", [])
-    rc = RECOMP[hid]
-    return rc["appear"], rc["green"], rc.get("cache_hits", [])
+SYNTH_TIERS = [(0.6, "Client", "Clients"), (0.25, "API Server", "API Servers"), (0.15, "Backend", "Backend Servers")]
+SYNTH_COLS = [10, 295, 580]
+SYNTH_ROW_H = 16  # px per node in a box's tallest layer
+SYNTH_MAX_NODES = 36  # keeps the per-node invalidation stagger within the cycle
+
+def synthetic_spec(host_count, node_count, seed=0):
+    """A random clients → API servers → backends topology, with one DB change invalidating what depends on it."""
+    rng = random.Random(seed)
+    avg = max(3, node_count / host_count)
+    tiers = []
+    remaining = host_count
+    for i, (share, label, _title) in enumerate(SYNTH_TIERS):
+        later = len(SYNTH_TIERS) - 1 - i
+        count = remaining if not later else max(1, min(round(host_count * share), remaining - later))
+        remaining -= count
+        tiers.append([f"{label[0]}{j + 1}" for j in range(count)])
+
+    hosts = {}
+    layers = {}  # hid -> [[node, ...] per layer]
+    for tier, hids in enumerate(tiers):
+        label = SYNTH_TIERS[tier][1]
+        col_x, y = SYNTH_COLS[tier], 42
+        for hid in hids:
+            n = min(SYNTH_MAX_NODES, max(3, round(rng.uniform(3, 2 * avg - 3))))
+            layer_count = max(2, round(math.sqrt(n)))
+            host_layers = [list(range(n))[l * n // layer_count:(l + 1) * n // layer_count] for l in range(layer_count)]
+            is_backend = tier == len(tiers) - 1
+            edges = []
+            for prev, members in zip(host_layers, host_layers[1:]):
+                for dst in members:
+                    sources = {rng.choice(prev)} | {src for src in prev if rng.random() < 0.15}
+                    edges += [(src, dst) for src in sorted(sources)]
+            h = SYNTH_ROW_H * max(len(m) for m in host_layers) + HDR_H + 2 * PAD
+            hosts[hid] = {
+                "box": [box_x(col_x), y, BOX_W, h],
+                "label": f"{label} {hid[1:]}",
+                "nodes": n,
+                "edges": edges,
+            }
+            if is_backend:
+                hosts[hid]["db"] = host_layers[-1]
+            layers[hid] = host_layers
+            y += h + 8
+
+    cross = []
+    for left, right in zip(tiers, tiers[1:]):
+        for hid in left:
+            for src in layers[hid][-1]:
+                target = rng.choice(right)
+                cross.append((hid, src, target, rng.choice(layers[target][0])))
+
+    dependents = {}
+    for hid, host in hosts.items():
+        for src, dst in host["edges"]:
+            dependents.setdefault((hid, dst), []).append((hid, src))
+    for fh, fn, th, tn in cross:
+        dependents.setdefault((th, tn), []).append((fh, fn))
+    def upstream(node):
+        found, stack = set(), [node]
+        while stack:
+            for dependent in dependents.get(stack.pop(), ()):
+                if dependent not in found:
+                    found.add(dependent)
+                    stack.append(dependent)
+        return found
+
+    # The busiest of a few random DB nodes, so the invalidation reaches a good part of the graph
+    candidates = [(hid, rng.choice(hosts[hid]["db"])) for hid in rng.choices(tiers[-1], k=8)]
+    db_change = max((len(upstream(node)), node) for node in candidates)[1]
+    bottom = max(h["box"][1] + h["box"][3] for h in hosts.values())
+    return {
+        "duration": DUR,
+        "canvas": {"width": 870, "height": bottom + 110},
+        "columns": [{"x": x, "title": t[2]} for x, t in zip(SYNTH_COLS, SYNTH_TIERS)],
+        "hosts": hosts,
+        "cross": [list(e) for e in cross],
+        "dbChange": list(db_change),
+    }
+
+SIMULATED_KEYS = ("crossAffected", "crossSafe", "invalidation", "recomputation", "nodeRecomputation", "crossTimings")
+
+def with_timings(spec, resimulate=False):
+    """The spec itself if it has timing tables, otherwise (or if asked) a copy with simulated ones."""
+    if "recomputation" in spec and not resimulate:
+        return spec
+    cross = spec.get("cross") or [*spec.get("crossAffected", ()), *spec.get("crossSafe", ())]
+    spec = {k: v for k, v in spec.items() if k not in SIMULATED_KEYS}
+    spec["hosts"] = {hid: {k: v for k, v in h.items() if k != "affected"} for hid, h in spec["hosts"].items()}
+    spec["cross"] = cross
+    return simulate(spec)
 
 # ═══════════════════════════════════════════
 # CSS GENERATION
 # ═══════════════════════════════════════════
 
-def gen_css():
-    L = []
-
-    # Font classes
-    L.append("""      .sh { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 11px; fill: #8b90a8; font-weight: 600; letter-spacing: 0.5px; text-transform: uppercase }
-      .bl { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 9px; fill: #5c6b82; font-weight: 500 }
-      .wh { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 9px; fill: #5c6b82; font-weight: 600 }
-      .dbl { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 8px; fill: #a09488; font-weight: 500; font-style: italic }
-      .lg { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 10px; fill: #8b90a8; font-style: italic; stroke: none }
-      .desc { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 11px; fill: #5c6b82; font-weight: 500; text-anchor: middle }""")
-
-    L.append(f"\n      /* {DUR}s cycle. Invalidation R→L with fade+drift, recomputation L→R with cache hits. */")
-
-    # --- Old node keyframes (fade + drift down, staggered R→L) ---
-    L.append("\n      /* Old nodes: bleach → fade + drift down (staggered by x-position) */")
-    for hid in INV:
-        for idx in HOSTS[hid]["affected"]:
-            inv = node_inv_pct(hid, idx)
+def animations(topo):
+    """(kind, element id, keyframes name, stops) per animated element; a stop is ((pct, ...), declarations)."""
+    # Old nodes: bleach → fade + drift down (staggered by x-position)
+    for hid in topo.inv:
+        for idx in topo.hosts[hid]["affected"]:
+            inv = topo.node_inv_pct(hid, idx)
             gone = inv + FADE_LEN
             name = f"old-{nid(hid, idx)}"
-            L.append(f"""      @keyframes {name} {{
-        0%,{inv}% {{fill:{GREEN_F};stroke:{GREEN_S};stroke-width:1.5;opacity:1;transform:translateY(0)}}
-        {inv+1}% {{fill:{BLEACH_F};stroke:{BLEACH_S};stroke-width:1.5;opacity:0.85;transform:translateY(2px)}}
-        {gone}% {{fill:{BLEACH_F};stroke:{BLEACH_S};stroke-width:1.5;opacity:0;transform:translateY({DRIFT_PX}px)}}
-        100% {{opacity:0;transform:translateY({DRIFT_PX}px)}}
-      }}""")
-
-    # --- New node keyframes (appear blue → green, with per-node overrides) ---
-    L.append("\n      /* New nodes: appear computing → green (with optional cache-hit flashes) */")
-    for hid in RECOMP:
-        for idx in HOSTS[hid]["affected"]:
-            app, grn, hits = node_recomp(hid, idx)
+            yield "old", name, name, [
+                ((0, inv), f"fill:{GREEN_F};stroke:{GREEN_S};stroke-width:1.5;opacity:1;transform:translateY(0)"),
+                ((inv + 1,), f"fill:{BLEACH_F};stroke:{BLEACH_S};stroke-width:1.5;opacity:0.85;transform:translateY(2px)"),
+                ((gone,), f"fill:{BLEACH_F};stroke:{BLEACH_S};stroke-width:1.5;opacity:0;transform:translateY({DRIFT_PX}px)"),
+                ((100,), f"opacity:0;transform:translateY({DRIFT_PX}px)"),
+            ]
+
+    # New nodes: appear computing → green (with optional cache-hit flashes)
+    for hid in topo.recomp:
+        for idx in topo.hosts[hid]["affected"]:
+            app, grn, hits = topo.node_recomp(hid, idx)
             name = f"new-{nid(hid, idx)}"
-            # Build keyframe entries as sorted list of (pct, value)
             entries = []
             entries.append((0, f"fill:{BLUE_F};stroke:{BLUE_S};stroke-width:1.5;opacity:0"))
             entries.append((app - 1, f"fill:{BLUE_F};stroke:{BLUE_S};stroke-width:1.5;opacity:0"))
@@ -292,135 +324,272 @@ def gen_css():
             by_pct = {}
             for pct, val in entries:
                 by_pct[pct] = val
-            sorted_entries = sorted(by_pct.items())
-            inner = "\n".join(f"        {pct}% {{{val}}}" for pct, val in sorted_entries)
-            L.append(f"      @keyframes {name} {{\n{inner}\n      }}")
-
-    # --- B2 DB node flash ---
-    L.append(f"""
-      /* B2 DB node flash */
-      @keyframes db-flash {{
-        0%,7% {{fill:{DB_F};stroke:{DB_S};stroke-width:1.5}}
-        8%,10% {{fill:{DB_FLASH_F};stroke:{DB_FLASH_S};stroke-width:2.5}}
-        12%,100% {{fill:{DB_F};stroke:{DB_S};stroke-width:1.5}}
-      }}""")
-
-    # --- Internal edge keyframes (use source node's inv/recomp timing) ---
-    L.append("\n      /* Animated internal edges */")
-    for hid in INV:
-        host = HOSTS[hid]
-        rc = RECOMP.get(hid)
-        if not rc:
+            yield "new", name, name, [((pct,), val) for pct, val in sorted(by_pct.items())]
+
+    # Changed DB node flash
+    if topo.db_change:
+        yield "db", f"db-{nid(*topo.db_change)}", "db-flash", [
+            ((0, 7), f"fill:{DB_F};stroke:{DB_S};stroke-width:1.5"),
+            ((8, 10), f"fill:{DB_FLASH_F};stroke:{DB_FLASH_S};stroke-width:2.5"),
+            ((12, 100), f"fill:{DB_F};stroke:{DB_S};stroke-width:1.5"),
+        ]
+
+    # Internal edges use their source node's inv/recomp timing
+    for hid in topo.inv:
+        host = topo.hosts[hid]
+        if not topo.recomp.get(hid):
             continue
         for src, dst in host["edges"]:
-            if is_edge_animated(hid, src, dst):
-                inv = node_inv_pct(hid, src)
-                recon, _, _ = node_recomp(hid, src)
+            if topo.is_edge_animated(hid, src, dst):
+                inv = topo.node_inv_pct(hid, src)
+                recon, _, _ = topo.node_recomp(hid, src)
                 ename = f"ie-{nid(hid, src)}-{nid(hid, dst)}"
-                L.append(f"""      @keyframes {ename} {{
-        0%,{inv}% {{opacity:1}} {inv+1}% {{opacity:0}} {recon-1}% {{opacity:0}} {recon}%,100% {{opacity:1}}
-      }}""")
+                yield "ie", ename, ename, [
+                    ((0, inv), "opacity:1"), ((inv + 1,), "opacity:0"), ((recon - 1,), "opacity:0"), ((recon, 100), "opacity:1"),
+                ]
 
-    # --- Cross-box edge keyframes ---
-    L.append("\n      /* Volatile cross-box edges */")
-    for key, (disc, recon) in CROSS_DISC_RECON.items():
+    # Volatile cross-box edges
+    for key, (disc, recon) in topo.cross_disc_recon.items():
         fh, fn, th, tn = key
         ename = f"xe-{nid(fh, fn)}-{nid(th, tn)}"
-        L.append(f"""      @keyframes {ename} {{
-        0%,{disc}% {{opacity:0.5}} {disc+1}% {{opacity:0}} {recon-1}% {{opacity:0}} {recon}%,100% {{opacity:0.5}}
-      }}""")
-
-    # --- Box stroke keyframes (earliest inv → latest green) ---
-    L.append("\n      /* Box stroke animations */")
-    for hid in INV:
-        rc = RECOMP.get(hid)
-        if not rc:
+        yield "xe", ename, ename, [
+            ((0, disc), "opacity:0.5"), ((disc + 1,), "opacity:0"), ((recon - 1,), "opacity:0"), ((recon, 100), "opacity:0.5"),
+        ]
+
+    # Box strokes: earliest inv → latest green
+    for hid in topo.inv:
+        if not topo.recomp.get(hid):
             continue
-        affected = HOSTS[hid]["affected"]
-        earliest_inv = min(node_inv_pct(hid, i) for i in affected)
-        first_app = min(node_recomp(hid, i)[0] for i in affected)
-        latest_grn = max(node_recomp(hid, i)[1] for i in affected)
-        L.append(f"""      @keyframes bx-{hid} {{
-        0%,{earliest_inv-1}% {{stroke:#c0c8d4}}
-        {earliest_inv}%,{first_app-1}% {{stroke:{BLEACH_S}}}
-        {first_app}%,{latest_grn-1}% {{stroke:{BLUE_S}}}
-        {latest_grn}%,100% {{stroke:#c0c8d4}}
-      }}""")
-
-    # --- Description keyframes ---
-    L.append("\n      /* Description text phases */")
-    for i, (start, end, _text) in enumerate(DESCRIPTIONS):
-        L.append(f"""      @keyframes desc-{i} {{
-        0%,{max(0, start-1)}% {{opacity:0}} {start}%,{end}% {{opacity:1}} {min(100, end+1)}%,100% {{opacity:0}}
-      }}""")
-
-    # --- Apply animations ---
-    L.append("\n      /* Apply animations */")
+        affected = topo.hosts[hid]["affected"]
+        earliest_inv = min(topo.node_inv_pct(hid, i) for i in affected)
+        first_app = min(topo.node_recomp(hid, i)[0] for i in affected)
+        latest_grn = max(topo.node_recomp(hid, i)[1] for i in affected)
+        yield "bx", f"bx-{hid}", f"bx-{hid}", [
+            ((0, earliest_inv - 1), "stroke:#c0c8d4"),
+            ((earliest_inv, first_app - 1), f"stroke:{BLEACH_S}"),
+            ((first_app, latest_grn - 1), f"stroke:{BLUE_S}"),
+            ((latest_grn, 100), "stroke:#c0c8d4"),
+        ]
+
+    # Description text phases
+    for i, (start, end, _text) in enumerate(topo.descriptions):
+        yield "desc", f"desc-{i}", f"desc-{i}", [
+            ((0, max(0, start - 1)), "opacity:0"), ((start, end), "opacity:1"), ((min(100, end + 1), 100), "opacity:0"),
+        ]
+
+ANIMATION_COMMENTS = {
+    "old": "Old nodes: bleach → fade + drift down (staggered by x-position)",
+    "new": "New nodes: appear computing → green (with optional cache-hit flashes)",
+    "ie": "Animated internal edges",
+    "xe": "Volatile cross-box edges",
+    "bx": "Box stroke animations",
+    "desc": "Description text phases",
+}
+ANIMATION_KINDS = ("old", "new", "db", "ie", "xe", "bx", "desc")
+ONE_LINE_KINDS = {"ie", "xe", "desc"}
 
-    # Old nodes
-    ids = []
-    for hid in INV:
-        for idx in HOSTS[hid]["affected"]:
-            name = f"old-{nid(hid, idx)}"
-            ids.append(f"#{name}{{animation:{name} {DUR}s ease infinite}}")
-    L.append("      " + " ".join(ids))
+def stop_selector(pcts):
+    return ",".join(f"{pct}%" for pct in pcts)
 
-    # New nodes
-    ids = []
-    for hid in RECOMP:
-        for idx in HOSTS[hid]["affected"]:
-            name = f"new-{nid(hid, idx)}"
-            ids.append(f"#{name}{{animation:{name} {DUR}s ease infinite}}")
-    L.append("      " + " ".join(ids))
+# Font classes
+TEXT_CSS = """      .sh { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 11px; fill: #8b90a8; font-weight: 600; letter-spacing: 0.5px; text-transform: uppercase }
+      .bl { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 9px; fill: #5c6b82; font-weight: 500 }
+      .wh { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 9px; fill: #5c6b82; font-weight: 600 }
+      .dbl { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 8px; fill: #a09488; font-weight: 500; font-style: italic }
+      .lg { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 10px; fill: #8b90a8; font-style: italic; stroke: none }
+      .desc { font-family: Inter,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; font-size: 11px; fill: #5c6b82; font-weight: 500; text-anchor: middle }"""
 
-    # DB flash
-    L.append(f"      #db-B2-3{{animation:db-flash {DUR}s ease infinite}}")
+def gen_css(topo, anims=None):
+    L = []
 
-    # Internal edges
-    ids = []
-    for hid in INV:
-        host = HOSTS[hid]
-        if hid not in RECOMP:
-            continue
-        for src, dst in host["edges"]:
-            if is_edge_animated(hid, src, dst):
-                ename = f"ie-{nid(hid, src)}-{nid(hid, dst)}"
-                ids.append(f"#{ename}{{animation:{ename} {DUR}s ease infinite}}")
-    if ids:
-        L.append("      " + " ".join(ids))
+    L.append(TEXT_CSS)
 
-    # Cross-box edges
-    ids = []
-    for key in CROSS_DISC_RECON:
-        fh, fn, th, tn = key
-        ename = f"xe-{nid(fh, fn)}-{nid(th, tn)}"
-        ids.append(f"#{ename}{{animation:{ename} {DUR}s ease infinite}}")
-    L.append("      " + " ".join(ids))
-
-    # Box strokes
-    ids = []
-    for hid in INV:
-        if hid in RECOMP:
-            ids.append(f"#bx-{hid}{{animation:bx-{hid} {DUR}s ease infinite}}")
-    L.append("      " + " ".join(ids))
-
-    # Descriptions
-    ids = []
-    for i in range(len(DESCRIPTIONS)):
-        ids.append(f"#desc-{i}{{animation:desc-{i} {DUR}s ease infinite}}")
-    L.append("      " + " ".join(ids))
+    L.append(f"\n      /* {topo.dur}s cycle. Invalidation R→L with fade+drift, recomputation L→R with cache hits. */")
+
+    by_kind = {}
+    for kind, element_id, name, stops in animations(topo) if anims is None else anims:
+        by_kind.setdefault(kind, []).append((element_id, name, stops))
+    for kind in ANIMATION_KINDS:
+        if kind == "db":
+            if kind in by_kind:
+                L.append(f"\n      /* {topo.db_change[0]} DB node flash */")
+        else:
+            L.append(f"\n      /* {ANIMATION_COMMENTS[kind]} */")
+        for _element_id, name, stops in by_kind.get(kind, ()):
+            frames = [f"{stop_selector(pcts)} {{{decls}}}" for pcts, decls in stops]
+            inner = " ".join(frames) if kind in ONE_LINE_KINDS else "\n        ".join(frames)
+            L.append(f"      @keyframes {name} {{\n        {inner}\n      }}")
+
+    L.append("\n      /* Apply animations */")
+    for kind in ANIMATION_KINDS:
+        if kind in by_kind:
+            L.append("      " + " ".join(
+                f"#{element_id}{{animation:{name} {topo.dur}s ease infinite}}" for element_id, name, _ in by_kind[kind]))
 
     return "\n".join(L)
 
 
+# ═══════════════════════════════════════════
+# COMPOSITOR-ONLY OUTPUT
+# ═══════════════════════════════════════════
+# Animating these repaints the element on every frame; opacity and transform don't
+PAINT_PROPERTIES = ("fill", "stroke", "stroke-width")
+
+def paint_layers(stops):
+    """Splits keyframes into the element's own stops without paint and one opacity-only layer per paint.
+
+    Layers are stacked by stroke width, so each one covers those below it. Fading the upper of two
+    layers in or out blends their colors just like interpolating fill and stroke does.
+    """
+    own, paints, active = [], [], []
+    for pcts, decls in stops:
+        props = dict(decl.split(":", 1) for decl in decls.split(";"))
+        paint = tuple((k, props.pop(k)) for k in PAINT_PROPERTIES if k in props)
+        if props:
+            own.append((pcts, ";".join(f"{k}:{v}" for k, v in props.items())))
+        if paint and paint not in paints:
+            paints.append(paint)
+        active.append(paint or None)
+    paints.sort(key=lambda paint: float(dict(paint).get("stroke-width", 0)))
+    rank = {paint: i for i, paint in enumerate(paints)}
+    layers = []
+    for i, paint in enumerate(paints):
+        values = [None if a is None or rank[a] > i else 1 if a == paint else 0 for a in active]
+        # A layer below the visible one is covered anyway: keeping its value avoids extra fades
+        known = [v for v in values if v is not None]
+        last = known[0] if known else 1
+        for j, v in enumerate(values):
+            values[j] = last = last if v is None else v
+        layers.append((paint, [(pcts, f"opacity:{v}") for (pcts, _), v in zip(stops, values)]))
+    return own, layers
+
+def compositor_animations(topo):
+    """animations() with paint changes moved onto pre-colored layers, and element id → [(layer id, paint attributes)].
+
+    The bottom layer is always visible, so it is static and has no id.
+    """
+    anims, layers = [], {}
+    for kind, element_id, name, stops in animations(topo):
+        own, paints = paint_layers(stops)
+        if not paints:
+            anims.append((kind, element_id, name, stops))
+            continue
+        if own:
+            anims.append((kind, element_id, name, own))
+        layers[element_id] = []
+        for i, (paint, layer_stops) in enumerate(paints):
+            layer_id = None if all(decls == "opacity:1" for _, decls in layer_stops) else f"{element_id}-{i}"
+            layers[element_id].append((layer_id, " ".join(f'{k}="{v}"' for k, v in paint)))
+            if layer_id:
+                anims.append((kind, layer_id, f"{name}-{i}", layer_stops))
+    return anims, layers
+
+def layer_circles(cx, cy, node_layers):
+    if not node_layers:
+        return f'<circle cx="{cx}" cy="{cy}" r="{NR}"/>'
+    circles = []
+    for layer_id, paint in node_layers:
+        id_attr = f'id="{layer_id}" ' if layer_id else ""
+        circles.append(f'<circle {id_attr}cx="{cx}" cy="{cy}" r="{NR}" {paint}/>')
+    return "".join(circles)
+
+# ═══════════════════════════════════════════
+# COMPACT OUTPUT
+# ═══════════════════════════════════════════
+# Class suffix → presentation attributes that static elements share through a class instead
+STATIC_CLASSES = [
+    ("n", f'fill="{GREEN_F}" stroke="{GREEN_S}" stroke-width="1.5"'),
+    ("d", f'fill="{DB_F}" stroke="{DB_S}" stroke-width="1.5"'),
+    ("e", 'stroke="#b8c0cc" stroke-width="1" stroke-linecap="round" marker-end="url(#ah)"'),
+    ("x", 'stroke="#8b90a8" stroke-width="1.5" stroke-linecap="round" stroke-dasharray="5,3"'),
+    ("b", 'fill="#f0f4fa" stroke="#c0c8d4" stroke-width="1.5"'),
+    ("h", 'fill="#e4e9f2"'),
+    ("l", 'stroke="#c0c8d4" stroke-width="1"'),
+]
+
+def diagram_prefix(path):
+    """Short prefix for compact class and keyframes names, which are global once the SVG is inlined into a page."""
+    return "".join(word[0] for word in re.findall(r"[a-z]+", Path(path).stem.lower())) or "d"
+
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s*([{};:,])\s*", r"\1", css.strip())
+    return re.sub(r"\s+", " ", css).replace(";}", "}")
+
+def merge_stops(stops):
+    """[(pct, {property: value})] in % order; stops at the same % cascade, so later declarations win."""
+    merged = {}
+    for pcts, decls in stops:
+        for pct in pcts:
+            merged.setdefault(pct, {}).update(decl.split(":", 1) for decl in decls.split(";"))
+    return sorted(merged.items())
+
+def normalize_keyframes(stops):
+    """Keyframes text with stops of equal declarations merged, plus the % it was rotated by.
+
+    Keyframes that start and end in the same state are rotated so their first change is at 0%;
+    a negative animation-delay turns them back. Elements whose keyframes differ only by such a
+    time offset (edges, boxes, descriptions) then share one @keyframes block.
+    """
+    flat = [(pct, ";".join(f"{k}:{v}" for k, v in props.items())) for pct, props in merge_stops(stops)]
+    shift = 0
+    if flat[0][0] == 0 and flat[-1][0] == 100 and flat[0][1] == flat[-1][1]:
+        i = 0
+        while i + 1 < len(flat) and flat[i + 1][1] == flat[0][1]:
+            i += 1
+        if flat[i][0] < 100:
+            shift = flat[i][0]
+            flat = [(pct - shift, decls) for pct, decls in flat[i:]] + [(100, flat[0][1])]
+    grouped = {}
+    for pct, decls in flat:
+        grouped.setdefault(decls, []).append(pct)
+    return "".join(f"{stop_selector(pcts)}{{{decls}}}" for decls, pcts in grouped.items()), shift
+
+def gen_compact_css(topo, prefix, anims=None):
+    parts = [minify_css(TEXT_CSS)]
+    for suffix, attrs in STATIC_CLASSES:
+        decls = ";".join(f"{k}:{v}" for k, v in re.findall(r'([\w-]+)="([^"]*)"', attrs))
+        parts.append(f".{prefix}{suffix}{{{decls}}}")
+    names, rules = {}, {}
+    for _kind, element_id, _name, stops in animations(topo) if anims is None else anims:
+        frames, shift = normalize_keyframes(stops)
+        name = names.setdefault(frames, f"{prefix}{len(names)}")
+        delay = f" {-round((100 - shift) * topo.dur / 100, 3):g}s" if shift else ""
+        rules.setdefault((name, delay), []).append(f"#{element_id}")
+    parts += [f"@keyframes {name}{{{frames}}}" for frames, name in names.items()]
+    parts += [f"{','.join(ids)}{{animation:{name} {topo.dur}s ease{delay} infinite}}" for (name, delay), ids in rules.items()]
+    return "".join(parts)
+
+def gen_compact_svg(topo, prefix, anims=None, layers=None):
+    """gen_svg() with deduplicated keyframes, class-shared static styles and no comments or indentation."""
+    svg = gen_svg(topo, gen_compact_css(topo, prefix, anims), layers)
+    for suffix, attrs in STATIC_CLASSES:
+        svg = svg.replace(attrs, f'class="{prefix}{suffix}"')
+    svg = re.sub(r"<!--.*?-->", "", svg)
+    out = []
+    for line in svg.split("\n"):
+        line = line.strip()
+        if line:
+            # Only tags split over several lines need a separator
+            out.append(line if not out or out[-1].endswith(">") or line.startswith("<") else " " + line)
+    return "".join(out)
+
+def print_size_report(readable, compact):
+    for label, svg in (("Readable", readable), ("Compact", compact)):
+        data = svg.encode()
+        print(f"{label + ':':<10}{len(data):>10,} bytes {len(gzip.compress(data)):>9,} gzipped "
+              f"{svg.count('@keyframes'):>6} keyframes {svg.count('{animation:'):>6} rules")
+    print(f"Saved {1 - len(compact.encode()) / len(readable.encode()):.0%}")
+
 # ═══════════════════════════════════════════
 # SVG GENERATION
 # ═══════════════════════════════════════════
 
-def gen_svg():
+def gen_svg(topo, css=None, layers=None):
+    layers = layers or {}
     P = []
 
-    P.append(f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SVG_W} {SVG_H}" width="100%" height="100%">')
+    P.append(f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {topo.svg_w} {topo.svg_h}" width="100%" height="100%">')
 
     # Defs
     P.append("""  <defs>
@@ -439,40 +608,42 @@ def gen_svg():
     </marker>
     <style>""")
 
-    P.append(gen_css())
+    P.append(gen_css(topo) if css is None else css)
 
     P.append("""    </style>
   </defs>""")
 
     # Background
-    P.append(f'  <rect width="{SVG_W}" height="{SVG_H}" rx="10" fill="url(#bg)"/>')
+    P.append(f'  <rect width="{topo.svg_w}" height="{topo.svg_h}" rx="10" fill="url(#bg)"/>')
 
-    # Section panels (equal width columns)
-    P.append(f"""
-  <!-- Section panels -->
-  <rect x="{COL1_X}" y="34" width="{COL_W - 5}" height="470" rx="8" fill="url(#sbg)"/>
-  <rect x="{COL2_X}" y="34" width="{COL_W - 5}" height="470" rx="8" fill="url(#sbg)"/>
-  <rect x="{COL3_X}" y="34" width="{COL_W - 5}" height="470" rx="8" fill="url(#sbg)"/>""")
+    # Section panels (equal width columns), leaving room for the description and legend below
+    panel_h = topo.svg_h - 130
+    P.append("\n  <!-- Section panels -->")
+    for col_x, _title in topo.columns:
+        P.append(f'  <rect x="{col_x}" y="34" width="{COL_W - 5}" height="{panel_h}" rx="8" fill="url(#sbg)"/>')
 
     # Division lines
-    P.append(f"""
-  <line x1="{DIV1_X}" y1="34" x2="{DIV1_X}" y2="504" stroke="#c8d0dc" stroke-width="1" stroke-dasharray="4,3" opacity="0.5"/>
-  <line x1="{DIV2_X}" y1="34" x2="{DIV2_X}" y2="504" stroke="#c8d0dc" stroke-width="1" stroke-dasharray="4,3" opacity="0.5"/>""")
+    P.append("")
+    for col_x, _title in topo.columns[1:]:
+        P.append(f'  <line x1="{col_x - 5}" y1="34" x2="{col_x - 5}" y2="{34 + panel_h}" stroke="#c8d0dc" stroke-width="1" stroke-dasharray="4,3" opacity="0.5"/>')
 
     # Section headers
-    P.append(f"""
-  <text x="{col_center(COL1_X)}" y="26" class="sh" text-anchor="middle">Clients</text>
-  <text x="{col_center(COL2_X)}" y="26" class="sh" text-anchor="middle">API Servers</text>
-  <text x="{col_center(COL3_X)}" y="26" class="sh" text-anchor="middle">Backend Servers</text>""")
+    P.append("")
+    for col_x, title in topo.columns:
+        P.append(f'  <text x="{col_center(col_x)}" y="26" class="sh" text-anchor="middle">{title}</text>')
 
     # --- Window-style Boxes ---
     P.append("\n  <!-- Window-style boxes -->")
-    animated_boxes = set(INV.keys()) & set(RECOMP.keys())
-    for hid, host in HOSTS.items():
+    animated_boxes = set(topo.inv.keys()) & set(topo.recomp.keys())
+    for hid, host in topo.hosts.items():
         bx, by, bw, bh = host["box"]
-        id_attr = f'id="bx-{hid}" ' if hid in animated_boxes else ""
+        box_layers = layers.get(f"bx-{hid}")
+        id_attr = f'id="bx-{hid}" ' if hid in animated_boxes and not box_layers else ""
         # Outer box
         P.append(f'  <rect {id_attr}x="{bx}" y="{by}" width="{bw}" height="{bh}" rx="6" fill="#f0f4fa" stroke="#c0c8d4" stroke-width="1.5"/>')
+        # Its other stroke colors, as outlines over the static one
+        for layer_id, paint in (box_layers or [])[1:]:
+            P.append(f'  <rect id="{layer_id}" x="{bx}" y="{by}" width="{bw}" height="{bh}" rx="6" fill="none" stroke-width="1.5" {paint}/>')
         # Header bar background
         P.append(f'  <rect x="{bx}" y="{by}" width="{bw}" height="{HDR_H}" rx="6" fill="#e4e9f2"/>')
         # Fill bottom corners of header (since outer rect has rx but header is only top)
@@ -484,8 +655,10 @@ def gen_svg():
 
     # --- DB partition lines ---
     P.append("\n  <!-- DB partition lines -->")
-    for hid in ["B1", "B2", "B3"]:
-        bx, by, bw, bh = HOSTS[hid]["box"]
+    for hid, host in topo.hosts.items():
+        if not host["db"]:
+            continue
+        bx, by, bw, bh = host["box"]
         body_top = by + HDR_H
         px = round(bx + DB_PART_FRAC * bw)
         P.append(f'  <line x1="{px}" y1="{body_top + 4}" x2="{px}" y2="{by + bh - 8}" stroke="#b8b0a4" stroke-width="1" stroke-dasharray="3,2" opacity="0.5"/>')
@@ -493,82 +666,84 @@ def gen_svg():
 
     # --- Static internal edges (source not affected) ---
     P.append("\n  <!-- Static internal edges -->")
-    for hid, host in HOSTS.items():
+    for hid, host in topo.hosts.items():
         for src, dst in host["edges"]:
-            if not is_edge_animated(hid, src, dst):
-                sx, sy, ex, ey = edge_pts(hid, src, hid, dst)
+            if not topo.is_edge_animated(hid, src, dst):
+                sx, sy, ex, ey = topo.edge_pts(hid, src, hid, dst)
                 P.append(f'  <line x1="{sx}" y1="{sy}" x2="{ex}" y2="{ey}" stroke="#b8c0cc" stroke-width="1" stroke-linecap="round" marker-end="url(#ah)"/>')
 
     # --- Animated internal edges ---
     P.append("\n  <!-- Animated internal edges -->")
-    for hid in INV:
-        host = HOSTS[hid]
-        if hid not in RECOMP:
+    for hid in topo.inv:
+        host = topo.hosts[hid]
+        if hid not in topo.recomp:
             continue
         for src, dst in host["edges"]:
-            if is_edge_animated(hid, src, dst):
+            if topo.is_edge_animated(hid, src, dst):
                 ename = f"ie-{nid(hid, src)}-{nid(hid, dst)}"
-                sx, sy, ex, ey = edge_pts(hid, src, hid, dst)
+                sx, sy, ex, ey = topo.edge_pts(hid, src, hid, dst)
                 P.append(f'  <line id="{ename}" x1="{sx}" y1="{sy}" x2="{ex}" y2="{ey}" stroke="#b8c0cc" stroke-width="1" stroke-linecap="round" marker-end="url(#ah)"/>')
 
     # --- Permanent cross-box edges (safe) ---
     P.append("\n  <!-- Permanent cross-box edges (safe path) -->")
-    for fh, fn, th, tn in CROSS_SAFE:
-        sx, sy, ex, ey = edge_pts(fh, fn, th, tn)
+    for fh, fn, th, tn in topo.cross_safe:
+        sx, sy, ex, ey = topo.edge_pts(fh, fn, th, tn)
         P.append(f'  <line x1="{sx}" y1="{sy}" x2="{ex}" y2="{ey}" stroke="#8b90a8" stroke-width="1.5" stroke-linecap="round" stroke-dasharray="5,3" opacity="0.35"/>')
 
     # --- Volatile cross-box edges (affected) ---
     P.append("\n  <!-- Volatile cross-box edges (affected path) -->")
-    for fh, fn, th, tn in CROSS_AFFECTED:
+    for fh, fn, th, tn in topo.cross_affected:
         ename = f"xe-{nid(fh, fn)}-{nid(th, tn)}"
-        sx, sy, ex, ey = edge_pts(fh, fn, th, tn)
+        sx, sy, ex, ey = topo.edge_pts(fh, fn, th, tn)
         P.append(f'  <line id="{ename}" x1="{sx}" y1="{sy}" x2="{ex}" y2="{ey}" stroke="#8b90a8" stroke-width="1.5" stroke-linecap="round" stroke-dasharray="5,3" opacity="0.5"/>')
 
     # --- Static nodes (safe, non-animated) ---
     P.append("\n  <!-- Static nodes -->")
-    for hid, host in HOSTS.items():
+    for hid, host in topo.hosts.items():
         for idx in range(len(host["nodes"])):
-            if is_affected(hid, idx) or is_db(hid, idx):
+            if topo.is_affected(hid, idx) or topo.is_db(hid, idx):
                 continue
-            cx, cy = abs_pos(hid, idx)
+            cx, cy = topo.abs_pos(hid, idx)
             P.append(f'  <circle cx="{cx}" cy="{cy}" r="{NR}" fill="{GREEN_F}" stroke="{GREEN_S}" stroke-width="1.5"/>')
 
-    # --- DB nodes (static except B2.d1 which flashes) ---
+    # --- DB nodes (static except the changed one, which flashes) ---
     P.append("\n  <!-- DB nodes -->")
-    for hid, host in HOSTS.items():
-        for idx in host.get("db", set()):
-            cx, cy = abs_pos(hid, idx)
-            if hid == "B2":
+    for hid, host in topo.hosts.items():
+        for idx in host["db"]:
+            cx, cy = topo.abs_pos(hid, idx)
+            if (hid, idx) == topo.db_change and f"db-{hid}-{idx}" in layers:
+                P.append(f'  <g id="db-{hid}-{idx}">{layer_circles(cx, cy, layers[f"db-{hid}-{idx}"])}</g>')
+            elif (hid, idx) == topo.db_change:
                 P.append(f'  <circle id="db-{hid}-{idx}" cx="{cx}" cy="{cy}" r="{NR}" fill="{DB_F}" stroke="{DB_S}" stroke-width="1.5"/>')
             else:
                 P.append(f'  <circle cx="{cx}" cy="{cy}" r="{NR}" fill="{DB_F}" stroke="{DB_S}" stroke-width="1.5"/>')
 
     # --- Old affected nodes (fade + drift groups) ---
     P.append("\n  <!-- Old nodes (fade + drift down during invalidation) -->")
-    for hid in INV:
-        for idx in HOSTS[hid]["affected"]:
-            cx, cy = abs_pos(hid, idx)
+    for hid in topo.inv:
+        for idx in topo.hosts[hid]["affected"]:
+            cx, cy = topo.abs_pos(hid, idx)
             gid = f"old-{nid(hid, idx)}"
-            P.append(f'  <g id="{gid}"><circle cx="{cx}" cy="{cy}" r="{NR}"/></g>')
+            P.append(f'  <g id="{gid}">{layer_circles(cx, cy, layers.get(gid))}</g>')
 
     # --- New affected nodes (appear during recomputation) ---
     P.append("\n  <!-- New nodes (appear during recomputation: blue → green) -->")
-    for hid in RECOMP:
-        for idx in HOSTS[hid]["affected"]:
-            cx, cy = abs_pos(hid, idx)
+    for hid in topo.recomp:
+        for idx in topo.hosts[hid]["affected"]:
+            cx, cy = topo.abs_pos(hid, idx)
             gid = f"new-{nid(hid, idx)}"
-            P.append(f'  <g id="{gid}"><circle cx="{cx}" cy="{cy}" r="{NR}"/></g>')
+            P.append(f'  <g id="{gid}">{layer_circles(cx, cy, layers.get(gid))}</g>')
 
     # --- Description text area ---
     P.append("\n  <!-- Description text -->")
-    desc_y = 530
-    for i, (_s, _e, text) in enumerate(DESCRIPTIONS):
-        P.append(f'  <text id="desc-{i}" x="{SVG_W // 2}" y="{desc_y}" class="desc" opacity="0">{text}</text>')
+    desc_y = topo.svg_h - 70
+    for i, (_s, _e, text) in enumerate(topo.descriptions):
+        P.append(f'  <text id="desc-{i}" x="{topo.svg_w // 2}" y="{desc_y}" class="desc" opacity="0">{text}</text>')
 
     # --- Legend ---
     P.append(f"""
   <!-- Legend -->
-  <g transform="translate({(SVG_W - 600) // 2}, {SVG_H - 20})">
+  <g transform="translate({(topo.svg_w - 600) // 2}, {topo.svg_h - 20})">
     <circle cx="0" cy="-2" r="4" fill="{GREEN_F}" stroke="{GREEN_S}" stroke-width="1.5"/>
     <text x="8" y="2" class="lg">consistent</text>
     <circle cx="90" cy="-2" r="4" fill="{BLEACH_F}" stroke="{BLEACH_S}" stroke-width="1.5"/>
@@ -587,37 +762,264 @@ def gen_svg():
     return "\n".join(P)
 
 
-if __name__ == "__main__":
-    svg = gen_svg()
-    out = "/proj/ActualLab.Fusion/docs/img/distributed-scaling.svg"
+# ═══════════════════════════════════════════
+# VALIDATION
+# ═══════════════════════════════════════════
+
+ID_ATTR = re.compile(r' id="([^"]+)"')
+# Elements with these id prefixes exist only to be animated
+ANIMATED_PREFIXES = ("old-", "new-", "ie-", "xe-", "bx-", "desc-")
+
+def check_diagram(topo, anims, svg):
+    """Problems with a generated diagram, from its timing tables, animations and markup; empty if there are none.
+
+    Checks that ids are unique, that every animation rule has its element and a single @keyframes
+    definition, that keyframe stops are in order within 0-100%, and that each recomputed node
+    is invalidated before it appears, and turns green before its cache hits.
+    """
+    problems = []
+    ids = set()
+    for element_id in ID_ATTR.findall(svg):
+        if element_id in ids:
+            problems.append(f"duplicate id {element_id!r}")
+        ids.add(element_id)
+
+    keyframes, animated = {}, set()
+    for _kind, element_id, name, stops in anims:
+        animated.add(element_id)
+        if element_id not in ids:
+            problems.append(f"#{element_id}: animation {name} has no element")
+        if keyframes.setdefault(name, stops) != stops:
+            problems.append(f"@keyframes {name}: defined twice with different stops")
+        pcts = [pct for stop_pcts, _ in stops for pct in stop_pcts]
+        if not all(0 <= pct <= 100 for pct in pcts):
+            problems.append(f"@keyframes {name}: stops outside 0-100%: {pcts}")
+        elif any(a > b for a, b in zip(pcts, pcts[1:])):
+            problems.append(f"@keyframes {name}: stops out of order: {pcts}")
+    problems += [f"#{element_id}: not animated" for element_id in ids - animated
+                 if element_id.startswith(ANIMATED_PREFIXES)]
+
+    for node, (app, grn, hits) in topo.recomp_pct.items():
+        inv = topo.inv_pct.get(node)
+        if inv is not None and inv >= app:
+            problems.append(f"{nid(*node)}: invalidated at {inv}%, not before it appears at {app}%")
+        if not app < grn or any(a >= b for a, b in zip([grn, *hits], hits)):
+            problems.append(f"{nid(*node)}: expected appear < green < cache hits, got {app}%, {grn}%, {hits}")
+    for edge, (disc, recon) in topo.cross_disc_recon.items():
+        if disc >= recon:
+            problems.append(f"{nid(*edge[:2])}→{nid(*edge[2:])}: reconnects at {recon}%, not after {disc}%")
+    return problems
+
+# ═══════════════════════════════════════════
+# MAIN
+# ═══════════════════════════════════════════
+
+def generate(spec, out, compact=None, compositor=None, size_report=False):
+    """Topology, animations, compositor layers and SVG text of a timed spec; None flags fall back to the spec's."""
+    topo = Topology(spec)
+    anims, layers = list(animations(topo)), None
+    if compositor if compositor is not None else spec.get("compositor", False):
+        anims, layers = compositor_animations(topo)
+    svg = gen_svg(topo, gen_css(topo, anims), layers)
+    if compact if compact is not None else spec.get("compact", False):
+        readable, svg = svg, gen_compact_svg(topo, diagram_prefix(out), anims, layers)
+        if size_report:
+            print_size_report(readable, svg)
+    return topo, anims, layers, svg
+
+def print_stats(svg):
+    print(f"Circles: {svg.count('<circle')}")
+    print(f"All {len(ID_ATTR.findall(svg))} IDs unique")
+    print(f"Keyframes: {svg.count('@keyframes')}")
+    print(f"Old node groups: {svg.count('<g id=' + chr(34) + 'old-')}")
+    print(f"New node groups: {svg.count('<g id=' + chr(34) + 'new-')}")
+
+BENCHMARK_SIZES = [(3, 10), (10, 100), (50, 1000), (150, 3000), (500, 10000), (1000, 20000)]  # (hosts, nodes)
+# Seeded sizes and counts are the same everywhere and shared; timings and memory are per machine
+BENCHMARK_BASELINE = Path(__file__).with_name("distributed-scaling.benchmark.json")
+BENCHMARK_LOCAL_BASELINE = Path(__file__).with_name(".benchmark-local.json")
+BENCHMARK_SHARED_KEYS = ("nodes", "problems", "bytes", "keyframes", "rules",
+                         "compact_bytes", "compact_keyframes", "compact_rules")
+# Allowed growth over the baseline before a run counts as a regression; timings are noisy, sizes are seeded
+BENCHMARK_TOLERANCE = {"ms": 0.5, "peak_kb": 0.2, "bytes": 0.02, "keyframes": 0.02, "rules": 0.02}
+BENCHMARK_SLACK_MS = 5  # short stages are mostly noise, so timings may also grow by this much
+BENCHMARK_STAGES = ("layout", "simulate", "index", "css", "svg", "compact", "check")
+
+def benchmark_run(spec):
+    """Stage timings in ms, output sizes and keyframe/rule counts of one readable + compact generation."""
+    marks = [time.perf_counter()]
+    spec = layout_spec(spec)
+    marks.append(time.perf_counter())
+    spec = with_timings(spec)
+    marks.append(time.perf_counter())
+    topo = Topology(spec)
+    marks.append(time.perf_counter())
+    anims = list(animations(topo))
+    css = gen_css(topo, anims)
+    marks.append(time.perf_counter())
+    svg = gen_svg(topo, css)
+    marks.append(time.perf_counter())
+    compact = gen_compact_svg(topo, "b", anims)
+    marks.append(time.perf_counter())
+    problems = check_diagram(topo, anims, svg)
+    marks.append(time.perf_counter())
+    result = {"nodes": len(topo.pos), "problems": len(problems)}
+    result["ms"] = {stage: round((b - a) * 1000, 2) for stage, a, b in zip(BENCHMARK_STAGES, marks, marks[1:])}
+    result["ms"]["total"] = round((marks[-1] - marks[0]) * 1000, 2)
+    for label, text in (("", svg), ("compact_", compact)):
+        result[label + "bytes"] = len(text.encode())
+        result[label + "keyframes"] = text.count("@keyframes")
+        result[label + "rules"] = text.count("{animation:")
+    return result
+
+def benchmark_suite(repeat=5):
+    """Per synthetic size: each stage's fastest of repeat runs, plus peak traced memory from one more run."""
+    import tracemalloc
+    results = {}
+    for host_count, node_count in BENCHMARK_SIZES:
+        spec = synthetic_spec(host_count, node_count)
+        runs = [benchmark_run(spec) for _ in range(repeat)]
+        best = runs[0]
+        best["ms"] = {stage: min(r["ms"][stage] for r in runs) for stage in best["ms"]}
+        tracemalloc.start()
+        benchmark_run(spec)
+        best["peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+        results[f"{host_count}x{node_count}"] = best
+    return results
+
+def benchmark_regressions(results, baseline):
+    """Metrics that grew past their tolerance over the baseline; sizes missing from either side are skipped."""
+    regressions = []
+    for size, result in results.items():
+        base = baseline.get(size)
+        if base is None:
+            continue
+        if result["problems"] > base["problems"]:
+            regressions.append(f"{size}: check_diagram reports {result['problems']} problems")
+        metrics = [(f"{stage} ms", result["ms"][stage], base.get("ms", {}).get(stage), "ms") for stage in result["ms"]]
+        metrics += [(key, result[key], base.get(key), next(k for k in BENCHMARK_TOLERANCE if key.endswith(k)))
+                    for key in result if key.endswith(("peak_kb", "bytes", "keyframes", "rules"))]
+        for name, value, old, kind in metrics:
+            limit = None if old is None else old * (1 + BENCHMARK_TOLERANCE[kind]) + (BENCHMARK_SLACK_MS if kind == "ms" else 0)
+            if limit is not None and value > limit:
+                regressions.append(f"{size} {name}: {value:,} > {old:,} (+{BENCHMARK_TOLERANCE[kind]:.0%} allowed)")
+    return regressions
+
+def benchmark(baseline_path=None, update=False, repeat=5):
+    """Compares to baseline_path if given, otherwise to the shared baseline and this machine's local one."""
+    results = benchmark_suite(repeat)
+    print(f"{'size':>10} {'nodes':>6} " + " ".join(f"{stage:>8}" for stage in (*BENCHMARK_STAGES, "total"))
+          + f" {'peak KB':>9} {'bytes':>10} {'compact':>10} {'kf':>5} {'rules':>5}")
+    for size, r in results.items():
+        print(f"{size:>10} {r['nodes']:>6} " + " ".join(f"{ms:>8.1f}" for ms in r["ms"].values())
+              + f" {r['peak_kb']:>9,} {r['bytes']:>10,} {r['compact_bytes']:>10,} {r['keyframes']:>5} {r['rules']:>5}"
+              + (f"  {r['problems']} problems" if r["problems"] else ""))
+    shared = {size: {key: r[key] for key in BENCHMARK_SHARED_KEYS} for size, r in results.items()}
+    baselines = [(baseline_path, results)] if baseline_path else [
+        (BENCHMARK_BASELINE, shared), (BENCHMARK_LOCAL_BASELINE, results)]
+    if update:
+        for path, recorded in baselines:
+            path.write_text(json.dumps(recorded, indent=2) + "\n", encoding="utf-8")
+            print(f"Baseline written to {path}")
+        return
+    regressions, compared = [], []
+    for path, _ in baselines:
+        if path.exists():
+            regressions += benchmark_regressions(results, json.loads(path.read_text(encoding="utf-8")))
+            compared.append(str(path))
+        else:
+            print(f"No baseline at {path}; run with --update-baseline to record one")
+    for regression in regressions:
+        print(f"regression: {regression}", file=sys.stderr)
+    if regressions:
+        raise SystemExit(1)
+    if compared:
+        print(f"No regressions against {' and '.join(compared)}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate an animated distributed-scaling SVG from a diagram spec")
+    parser.add_argument("spec", type=Path, nargs="?", default=DEFAULT_SPEC)
+    parser.add_argument("-o", "--output", type=Path, help="default: the spec's path with an .svg suffix")
+    parser.add_argument("--synthetic", type=int, nargs=2, metavar=("HOSTS", "NODES"),
+                        help="generate a random topology of about this size instead of reading the spec")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-spec", type=Path, help="also write the spec the diagram was generated from")
+    parser.add_argument("--layout", action="store_true",
+                        help="place the nodes of every host automatically, not just of hosts that give a node count")
+    parser.add_argument("--simulate", action="store_true",
+                        help="derive the timing tables from the dependency graph even if the spec has them")
+    parser.add_argument("--compact", action=argparse.BooleanOptionalAction,
+                        help="size-optimized output and a byte report (default: the spec's \"compact\" flag)")
+    parser.add_argument("--compositor", action=argparse.BooleanOptionalAction,
+                        help="animate only opacity and transform, over pre-colored layers "
+                             "(default: the spec's \"compositor\" flag)")
+    parser.add_argument("--print-tables", action="store_true", help="print the timing tables as JSON")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="measure generation for synthetic topologies of 10 to 20k nodes and compare to a baseline")
+    parser.add_argument("--baseline", type=Path,
+                        help="benchmark baseline JSON to compare to (default: the shared sizes and counts in "
+                             f"{BENCHMARK_BASELINE.name}, and this machine's timings in {BENCHMARK_LOCAL_BASELINE.name})")
+    parser.add_argument("--update-baseline", action="store_true", help="record the benchmark results as the baseline")
+    parser.add_argument("--repeat", type=int, default=5, help="benchmark runs per size; each stage's fastest counts")
+    parser.add_argument("--storm", type=int, metavar="EVENTS",
+                        help="fire this many random DB changes at the topology and report their cost")
+    parser.add_argument("--storm-changes", type=int, default=1, metavar="K", help="DB nodes changed per storm event")
+    parser.add_argument("--topologies", type=int, default=1,
+                        help="with --synthetic and --storm, random topologies to storm (seeds from --seed on)")
+    parser.add_argument("--frames", type=int, metavar="N", help="also render N evenly spaced frames of the cycle to PNG")
+    parser.add_argument("--frames-dir", type=Path, help="default: the output's path without suffix, plus -frames")
+    parser.add_argument("--frame-width", type=int, default=1200, help="frame width in pixels")
+    parser.add_argument("--apng", type=Path, help="also join the frames into a looping animated PNG")
+    parser.add_argument("--jobs", type=int, help="frame rendering processes (default: one per CPU)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.benchmark:
+        benchmark(args.baseline, args.update_baseline, args.repeat)
+        return
+    if args.storm:
+        from invalidation_storm import print_storm_report, storm
+        seeds = range(args.seed, args.seed + args.topologies) if args.synthetic else [args.seed]
+        specs = {f"seed {seed}" if args.synthetic else default_output(args.spec).stem: (
+            synthetic_spec(*args.synthetic, seed=seed) if args.synthetic else load_spec(args.spec)) for seed in seeds}
+        started = time.perf_counter()
+        results = {name: storm(spec, args.storm, args.storm_changes, args.seed) for name, spec in specs.items()}
+        print_storm_report(results)
+        print(f"Simulated {args.storm * len(specs):,} events in {time.perf_counter() - started:.2f}s")
+        return
+    if args.synthetic:
+        spec = synthetic_spec(*args.synthetic, seed=args.seed)
+        out = args.output or Path(f"synthetic-{args.synthetic[0]}x{args.synthetic[1]}.svg")
+    else:
+        spec = load_spec(args.spec)
+        out = args.output or default_output(args.spec)
+    spec = with_timings(layout_spec(spec, args.layout), args.simulate)
+    if args.print_tables:
+        print(json.dumps({k: spec[k] for k in SIMULATED_KEYS}, indent=2))
+    if args.save_spec:
+        args.save_spec.write_text(json.dumps(spec, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+    topo, anims, layers, svg = generate(spec, out, args.compact, args.compositor, size_report=True)
+    problems = check_diagram(topo, anims, svg)
+    for problem in problems:
+        print(f"error: {problem}", file=sys.stderr)
+    if problems:
+        raise SystemExit(2)
     with open(out, "w") as f:
         f.write(svg)
     print(f"Generated {out}")
     print(f"Size: {len(svg)} bytes, {svg.count(chr(10)) + 1} lines")
+    print_stats(svg)
+    if args.frames:
+        from diagram_frames import export_frames
+        frames_dir = args.frames_dir or out.with_name(f"{out.stem}-frames")
+        started = time.perf_counter()
+        export_frames(gen_svg(topo, TEXT_CSS, layers), anims, topo.dur, args.frames, frames_dir,
+                      args.frame_width, args.jobs, args.apng)
+        print(f"Rendered {args.frames} frames to {frames_dir} in {time.perf_counter() - started:.1f}s")
 
-    import xml.etree.ElementTree as ET
-    tree = ET.parse(out)
-    root = tree.getroot()
-    ns = {'svg': 'http://www.w3.org/2000/svg'}
-
-    circles = root.findall('.//svg:circle', ns)
-    print(f"Circles: {len(circles)}")
 
-    from collections import Counter
-    ids = [e.get('id') for e in root.iter() if e.get('id')]
-    dupes = {k: v for k, v in Counter(ids).items() if v > 1}
-    if dupes:
-        print(f"DUPLICATE IDs: {dupes}")
-    else:
-        print(f"All {len(ids)} IDs unique")
-
-    import re
-    style = root.find('.//svg:style', ns).text
-    kfs = re.findall(r'@keyframes\s+([\w-]+)', style)
-    print(f"Keyframes: {len(kfs)}")
-
-    groups = root.findall('.//svg:g', ns)
-    old_g = [g for g in groups if (g.get('id') or '').startswith('old-')]
-    new_g = [g for g in groups if (g.get('id') or '').startswith('new-')]
-    print(f"Old node groups: {len(old_g)}")
-    print(f"New node groups: {len(new_g)}")
+if __name__ == "__main__":
+    main()
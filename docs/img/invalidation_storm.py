@@ -0,0 +1,138 @@
+"""Monte-Carlo invalidation storms: what many random DB changes cost a topology.
+
+Uses topology_sim's model of Fusion: a DB change invalidates every computed value that
+(transitively) depends on it, and each invalidated value is recomputed once, on demand. While
+recomputing, a value calls all of its dependencies; the first call to an invalidated dependency
+recomputes it, and every other call is a cache hit. Every caller of an invalidated value is
+invalidated too, so these counts don't depend on the order of requests, and each of them is a
+sum of per-node weights over the invalidated set.
+
+That makes a storm cheap: the invalidated set of every DB node is propagated for all DB nodes at
+once, as one boolean (DB nodes, nodes) matrix, and events with a single change just count how
+often each DB node was drawn. Events changing several DB nodes at once invalidate the union of
+their sets and are evaluated in batches.
+"""
+
+import numpy as np
+
+STORM_STATS = ("invalidated", "hosts", "calls", "hits", "invalidationHops", "callHops")
+PERCENTILES = (50, 90, 99)
+BATCH_CELLS = 1 << 23  # booleans per batch of multi-change events
+
+
+class StormGraph:
+    """A spec's dependency graph as arrays: nodes are numbered host by host, edges go caller → callee."""
+
+    def __init__(self, spec):
+        hosts = spec["hosts"]
+        counts = [h["nodes"] if isinstance(h["nodes"], int) else len(h["nodes"]) for h in hosts.values()]
+        offsets = dict(zip(hosts, np.concatenate(([0], np.cumsum(counts)[:-1])).tolist()))
+        self.size = int(sum(counts))
+        self.host_starts = np.array([offsets[hid] for hid, n in zip(hosts, counts) if n], dtype=np.int64)
+        edges = [(offsets[hid] + src, offsets[hid] + dst, False) for hid, h in hosts.items() for src, dst in h["edges"]]
+        cross = spec.get("cross") or [*spec.get("crossAffected", ()), *spec.get("crossSafe", ())]
+        edges += [(offsets[fh] + fn, offsets[th] + tn, True) for fh, fn, th, tn in cross]
+        edges = np.array(edges, dtype=np.int64).reshape(-1, 3)
+        self.caller, self.callee, self.cross = edges[:, 0], edges[:, 1], edges[:, 2].astype(bool)
+        self.db = np.array([offsets[hid] + idx for hid, h in hosts.items() for idx in h.get("db", ())], dtype=np.int64)
+        if not len(self.db):
+            raise ValueError("the spec has no DB nodes to change")
+
+        self.out_degree = np.bincount(self.caller, minlength=self.size)
+        self.has_caller = np.bincount(self.callee, minlength=self.size) > 0
+        self.cross_in = np.bincount(self.callee[self.cross], minlength=self.size)
+        self.cross_out = np.bincount(self.caller[self.cross], minlength=self.size)
+
+    def reach(self):
+        """(DB nodes, nodes) mask of each DB node and everything that depends on it."""
+        order = np.argsort(self.caller, kind="stable")
+        callers, callees = self.caller[order], self.callee[order]
+        starts = np.flatnonzero(np.r_[True, callers[1:] != callers[:-1]]) if len(callers) else callers
+        reached = np.zeros((len(self.db), self.size), dtype=bool)
+        reached[np.arange(len(self.db)), self.db] = True
+        if not len(callers):
+            return reached
+        for _ in range(self.size + 1):
+            # A caller is reached once any of its callees is, for all DB nodes at once
+            merged = np.logical_or.reduceat(reached[:, callees], starts, axis=1)
+            grown = reached[:, callers[starts]] | merged
+            if np.array_equal(grown, reached[:, callers[starts]]):
+                return reached
+            reached[:, callers[starts]] = grown
+        raise ValueError("dependency graph contains a cycle")
+
+    def stats(self, reached, changed):
+        """STORM_STATS per row of a (events, nodes) reached mask, given the changed DB nodes' mask."""
+        invalidated = reached & ~changed
+        calls = invalidated @ self.out_degree
+        return {
+            "invalidated": invalidated.sum(axis=1),
+            "hosts": np.logical_or.reduceat(invalidated, self.host_starts, axis=1).sum(axis=1),
+            "calls": calls,
+            "hits": calls - (reached & self.has_caller).sum(axis=1),
+            "invalidationHops": reached @ self.cross_in,
+            "callHops": invalidated @ self.cross_out,
+        }
+
+
+def storm(spec, events, changes=1, seed=0):
+    """Totals of STORM_STATS over events random DB changes, plus a histogram of invalidated nodes per event."""
+    graph = StormGraph(spec)
+    reached = graph.reach()
+    rng = np.random.default_rng(seed)
+    totals = dict.fromkeys(STORM_STATS, 0)
+    fan_out = np.zeros(graph.size + 1, dtype=np.int64)
+    if changes == 1:
+        per_db = graph.stats(reached, _one_hot(graph.db, graph.size))
+        drawn = np.bincount(rng.integers(len(graph.db), size=events), minlength=len(graph.db))
+        for key in STORM_STATS:
+            totals[key] = int(drawn @ per_db[key])
+        np.add.at(fan_out, per_db["invalidated"], drawn)
+    else:
+        batch = max(1, BATCH_CELLS // (changes * graph.size))
+        for start in range(0, events, batch):
+            picks = rng.integers(len(graph.db), size=(min(batch, events - start), changes))
+            changed = np.zeros((len(picks), graph.size), dtype=bool)
+            changed[np.arange(len(picks))[:, None], graph.db[picks]] = True
+            sampled = graph.stats(reached[picks].any(axis=1), changed)
+            for key in STORM_STATS:
+                totals[key] += int(sampled[key].sum())
+            fan_out += np.bincount(sampled["invalidated"], minlength=graph.size + 1)
+    return {"nodes": graph.size, "dbs": len(graph.db), "events": events, "totals": totals, "fanOut": fan_out}
+
+
+def _one_hot(indices, size):
+    mask = np.zeros((len(indices), size), dtype=bool)
+    mask[np.arange(len(indices)), indices] = True
+    return mask
+
+
+def percentiles(histogram):
+    """PERCENTILES and the maximum of the values a histogram counts."""
+    cumulative = np.cumsum(histogram)
+    ranks = [np.searchsorted(cumulative, cumulative[-1] * p / 100) for p in PERCENTILES]
+    return [int(r) for r in ranks] + [int(np.flatnonzero(histogram)[-1])]
+
+
+def print_storm_report(results):
+    header = " ".join(f"{'p' + str(p):>5}" for p in PERCENTILES)
+    width = max(9, *(len(name) for name in results))
+    print(f"{'topology':>{width}} {'nodes':>6} {'dbs':>5} {'events':>10} {'recomp/ev':>10} {'hosts/ev':>9} "
+          f"{'hit ratio':>9} {'inv hops/ev':>11} {'call hops/ev':>12}  fan-out {header} {'max':>5}")
+    rows = list(results.items())
+    if len(rows) > 1:
+        combined = {
+            "nodes": round(np.mean([r["nodes"] for r in results.values()])),
+            "dbs": round(np.mean([r["dbs"] for r in results.values()])),
+            "events": sum(r["events"] for r in results.values()),
+            "totals": {key: sum(r["totals"][key] for r in results.values()) for key in STORM_STATS},
+            "fanOut": sum(np.pad(r["fanOut"], (0, max(len(x["fanOut"]) for x in results.values()) - len(r["fanOut"])))
+                          for r in results.values()),
+        }
+        rows.append(("all", combined))
+    for name, r in rows:
+        totals, events = r["totals"], r["events"]
+        print(f"{name:>{width}} {r['nodes']:>6} {r['dbs']:>5} {events:>10,} {totals['invalidated'] / events:>10.1f} "
+              f"{totals['hosts'] / events:>9.1f} {totals['hits'] / max(totals['calls'], 1):>9.1%} "
+              f"{totals['invalidationHops'] / events:>11.1f} {totals['callHops'] / events:>12.1f}          "
+              + " ".join(f"{v:>5}" for v in percentiles(r["fanOut"])))
@@ -0,0 +1,171 @@
+"""Derive a diagram's invalidation and recomputation timelines from its dependency graph.
+
+Models Fusion's semantics on the spec's nodes: a DB change invalidates every computed value that
+(transitively) depends on it, right to left, and the invalidation crosses a network hop in
+INV_HOP. Then each top-level dependent asks for its value again, one request after another:
+a request recomputes invalidated dependencies on demand, and a dependency recomputed by an earlier
+request is a cache hit. Both passes visit each node and edge once.
+
+All times are % of the animation cycle.
+"""
+
+from collections import deque
+
+T_CHANGE = 8      # DB change (matches the db-flash keyframes)
+INV_HOP = 3       # invalidation crossing a network hop
+REC_START = 30    # first recomputation request
+CALL_HOP = 2      # recomputation call crossing a network hop
+RETURN_HOP = 2    # its result coming back
+COMPUTE = 4       # minimal time to recompute a value
+REQUEST_GAP = 6   # pause between two requests
+INV_END = 22      # latest host invalidation start; longer cascades are compressed
+REC_END = 92      # latest recomputation event; leaves room for a cache-hit flash
+
+
+def dependency_graph(spec):
+    """Node -> [(callee, crosses_hosts)] with every spec edge, and the cross-box edge list."""
+    callees = {}
+    for hid, host in spec["hosts"].items():
+        for idx in range(len(host["nodes"])):
+            callees[(hid, idx)] = []
+        for src, dst in host["edges"]:
+            callees[(hid, src)].append(((hid, dst), False))
+    cross = [tuple(e) for e in spec.get("cross") or [*spec.get("crossAffected", ()), *spec.get("crossSafe", ())]]
+    for fh, fn, th, tn in cross:
+        callees[(fh, fn)].append(((th, tn), True))
+    return callees, cross
+
+
+def invalidate(callees, db_change):
+    """Invalidation time per affected node: a 0-1 BFS, as internal edges are free and hops cost INV_HOP."""
+    callers = {node: [] for node in callees}
+    for node, deps in callees.items():
+        for callee, cross in deps:
+            callers[callee].append((node, cross))
+    times = {db_change: T_CHANGE}
+    queue = deque([db_change])
+    while queue:
+        node = queue.popleft()
+        t = times[node]
+        for caller, cross in callers[node]:
+            arrival = t + (INV_HOP if cross else 0)
+            if arrival < times.get(caller, arrival + 1):
+                times[caller] = arrival
+                if cross:
+                    queue.append(caller)
+                else:
+                    queue.appendleft(caller)
+    del times[db_change]
+    return times, callers
+
+
+def recompute(callees, callers, affected, order):
+    """Replays the requests of top-level dependents; returns node (appear, green) and host cache hits."""
+    appear, green, hits = {}, {}, {}
+    request_of = {}
+    roots = [node for node in order if node in affected and not any(c in affected for c, _ in callers[node])]
+    t = REC_START
+    for request, root in enumerate(roots):
+        if root in green:
+            continue
+        appear[root] = t
+        request_of[root] = request
+        # Iterative DFS frames: [node, next callee index, green so far, reached via a hop]
+        stack = [[root, 0, t + COMPUTE, False]]
+        while stack:
+            frame = stack[-1]
+            node, i, ready, _ = frame
+            deps = callees[node]
+            if i < len(deps):
+                frame[1] += 1
+                callee, cross = deps[i]
+                called = appear[node] + (CALL_HOP if cross else 0)
+                if callee in green and request_of[callee] < request:
+                    hits.setdefault(callee[0], set()).add(called)
+                    frame[2] = max(ready, called + (RETURN_HOP if cross else 0))
+                elif callee in affected and callee not in appear:
+                    appear[callee] = called
+                    request_of[callee] = request
+                    stack.append([callee, 0, called + COMPUTE, cross])
+                continue
+            stack.pop()
+            green[node] = ready
+            if stack:
+                stack[-1][2] = max(stack[-1][2], ready + (RETURN_HOP if frame[3] else 0))
+        t = green[root] + REQUEST_GAP
+    return appear, green, hits
+
+
+def _fit(start, end):
+    """Maps times from start on into [start, end], compressing only if they don't fit already."""
+    def fit(times):
+        last = max(times, default=start)
+        scale = min(1.0, (end - start) / (last - start)) if last > start else 1.0
+        return lambda t: round(start + (t - start) * scale)
+    return fit
+
+
+def simulate(spec):
+    """A copy of the spec with affected sets, cross-edge split and all timing tables derived."""
+    callees, cross = dependency_graph(spec)
+    db_change = tuple(spec["dbChange"])
+    inv_times, callers = invalidate(callees, db_change)
+    affected = set(inv_times)
+    order = list(callees)
+    appear, green, hits = recompute(callees, callers, affected, order)
+
+    host_order = {hid: i for i, hid in enumerate(spec["hosts"])}
+    host_inv = {}
+    for (hid, _), t in inv_times.items():
+        host_inv[hid] = min(t, host_inv.get(hid, t))
+    inv_fit = _fit(T_CHANGE, INV_END)(host_inv.values())
+    rec_fit = _fit(REC_START, REC_END)([*green.values(), *(t for ts in hits.values() for t in ts)])
+
+    def node_times(node):
+        app = rec_fit(appear[node])
+        return app, max(rec_fit(green[node]), app + 2)
+
+    # A host's timing is its first recomputed node's; nodes recomputed by other requests override it
+    recomp, node_recomp = {}, []
+    for node in sorted(appear, key=lambda n: (appear[n], host_order[n[0]], n[1])):
+        hid = node[0]
+        app, grn = node_times(node)
+        if hid not in recomp:
+            recomp[hid] = {"appear": app, "green": grn}
+        elif (recomp[hid]["appear"], recomp[hid]["green"]) != (app, grn):
+            node_recomp.append({"node": list(node), "appear": app, "green": grn})
+    for hid, times in hits.items():
+        # Hits flash the whole host, so only those after it turns green are shown
+        shown = sorted({rec_fit(t) for t in times} - set(range(recomp[hid]["green"] + 1))) if hid in recomp else []
+        if shown:
+            recomp[hid]["cacheHits"] = shown
+
+    result = dict(spec)
+    result["hosts"] = {
+        hid: {**host, "affected": sorted(idx for idx in range(len(host["nodes"])) if (hid, idx) in affected)}
+        for hid, host in spec["hosts"].items()
+    }
+    cross_affected = [e for e in cross if (e[0], e[1]) in affected]
+    result.pop("cross", None)
+    result["crossAffected"] = [list(e) for e in cross_affected]
+    result["crossSafe"] = [list(e) for e in cross if (e[0], e[1]) not in affected]
+    result["invalidation"] = {
+        hid: inv_fit(t) for hid, t in sorted(host_inv.items(), key=lambda item: (item[1], host_order[item[0]]))
+    }
+    result["recomputation"] = recomp
+    result["nodeRecomputation"] = node_recomp
+    result["crossTimings"] = [
+        {"edge": list(e), "disconnect": result["invalidation"][e[0]], "reconnect": node_times((e[0], e[1]))[0]}
+        for e in cross_affected
+    ]
+    if not spec.get("descriptions"):
+        inv_last = max(result["invalidation"].values(), default=T_CHANGE)
+        rec_last = max((r["green"] for r in recomp.values()), default=REC_START)
+        result["descriptions"] = [
+            [0, T_CHANGE - 2, "All computed values are consistent"],
+            [T_CHANGE - 1, T_CHANGE + 2, "A database change triggers invalidation"],
+            [T_CHANGE + 3, max(T_CHANGE + 3, inv_last + 4), "Invalidation cascades to every dependent computed value"],
+            [REC_START, rec_last, "Dependents recompute on demand, hitting the cache wherever a value is consistent"],
+            [min(99, rec_last + 6), 100, "All computed values are consistent again"],
+        ]
+    return result
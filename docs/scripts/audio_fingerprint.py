@@ -0,0 +1,125 @@
+"""Robust audio fingerprints for finding the unchanged parts of a re-cut recording.
+
+The audio is halved to 8 kHz, and every HOP samples a FRAME-sample window is reduced to a 32-bit
+word: bit b is set when the energy difference between log-spaced bands b and b + 1 grew since the
+previous frame. The bits survive re-encoding and small misalignment, so two recordings of the same
+audio agree on most of them, while unrelated audio agrees on about half.
+"""
+
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+SAMPLE_RATE = 8000  # The bands end at 2 kHz, so the 16 kHz input is averaged down
+FRAME = 1024
+HOP = 256
+WINDOW = 32  # Frames per matched window, about a second
+MAX_BIT_ERROR_RATE = 0.3
+MAX_CANDIDATES = 64  # Per word: silence and hum repeat the same words all over a recording
+BLOCK_FRAMES = 4096
+BAND_EDGES = np.geomspace(300, 2000, 34)
+
+
+def fingerprint(audio: np.ndarray) -> np.ndarray:
+    audio = np.asarray(audio[:len(audio) // 2 * 2], dtype=np.float32).reshape(-1, 2).mean(axis=1)
+    if len(audio) < FRAME:
+        return np.zeros(0, dtype=np.uint32)
+    frames = np.lib.stride_tricks.sliding_window_view(audio, FRAME)[::HOP]
+    bins = np.fft.rfftfreq(FRAME, 1 / SAMPLE_RATE)
+    first, last = np.searchsorted(bins, BAND_EDGES[[0, -1]])
+    band_starts = np.searchsorted(bins, BAND_EDGES[:-1]) - first
+    taper = np.hanning(FRAME).astype(np.float32)
+    energies = np.empty((len(frames), len(band_starts)), dtype=np.float32)
+    for start in range(0, len(frames), BLOCK_FRAMES):
+        spectrum = np.fft.rfft(frames[start:start + BLOCK_FRAMES] * taper, axis=1)[:, first:last]
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        energies[start:start + len(power)] = np.add.reduceat(power, band_starts, axis=1)
+    slopes = energies[:, :-1] - energies[:, 1:]
+    bits = np.diff(slopes, axis=0, prepend=slopes[:1]) > 0
+    return np.packbits(bits, axis=1, bitorder="little").view("<u4").ravel()
+
+
+def bit_error_rates(old: np.ndarray, starts: np.ndarray, window: np.ndarray) -> np.ndarray:
+    differences = old[starts[:, None] + np.arange(len(window))] ^ window
+    return np.unpackbits(differences.view(np.uint8), axis=1).mean(axis=1)
+
+
+def match_windows(old: np.ndarray, new: np.ndarray) -> list[int | None]:
+    """For each WINDOW of ``new``, the frame where it starts in ``old``, or None if it isn't there."""
+    positions: dict[int, list[int]] = {}
+    for position, word in enumerate(old.tolist()):
+        candidates = positions.setdefault(word, [])
+        if len(candidates) < MAX_CANDIDATES:
+            candidates.append(position)
+    last_start = len(old) - WINDOW
+    matches: list[int | None] = []
+    shift: int | None = None
+    for start in range(0, len(new) - WINDOW + 1, WINDOW):
+        window = new[start:start + WINDOW]
+        # Most windows continue the previous window's alignment, so that one is tried first
+        if shift is not None and 0 <= start - shift <= last_start:
+            if bit_error_rates(old, np.array([start - shift]), window)[0] <= MAX_BIT_ERROR_RATE:
+                matches.append(start - shift)
+                continue
+        candidates = {
+            position - offset
+            for offset, word in enumerate(window.tolist())
+            for position in positions.get(word, ())
+            if 0 <= position - offset <= last_start
+        }
+        match = None
+        if candidates:
+            starts = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            rates = bit_error_rates(old, starts, window)
+            if rates.min() <= MAX_BIT_ERROR_RATE:
+                match = int(starts[rates.argmin()])
+        shift = None if match is None else start - match
+        matches.append(match)
+    return matches
+
+
+def unchanged_runs(matches: list[int | None]) -> list[tuple[float, float, float]]:
+    """Collapses window matches into (start, end, shift) runs, in seconds of the new audio."""
+    runs: list[list[int]] = []
+    for i, match in enumerate(matches):
+        if match is None:
+            continue
+        start, shift = i * WINDOW, i * WINDOW - match
+        if runs and runs[-1][1] == start and runs[-1][2] == shift:
+            runs[-1][1] = start + WINDOW
+        else:
+            runs.append([start, start + WINDOW, shift])
+    seconds = HOP / SAMPLE_RATE
+    return [(start * seconds, end * seconds, shift * seconds) for start, end, shift in runs]
+
+
+def plan_splice(
+    runs: list[tuple[float, float, float]],
+    old_segments: list[dict],
+    duration: float,
+) -> tuple[list[dict], list[tuple[float, float]]]:
+    """Old segments to keep (shifted into the new timeline) and the regions to transcribe again.
+
+    Only segments entirely inside an unchanged run are kept; everything between kept segments
+    that isn't covered by a single run, including the segments cut by a run boundary, is redone.
+    """
+    old_starts = [segment["start"] for segment in old_segments]
+    kept: list[dict] = []
+    run_ids: list[int] = []
+    for run_id, (start, end, shift) in enumerate(runs):
+        first = bisect_left(old_starts, start - shift)
+        last = bisect_right(old_starts, end - shift)
+        for segment in old_segments[first:last]:
+            if segment["end"] <= end - shift:
+                kept.append({**segment, "start": segment["start"] + shift, "end": segment["end"] + shift})
+                run_ids.append(run_id)
+    regions: list[tuple[float, float]] = []
+    for i in range(len(kept) + 1):
+        # The gap before kept[i] is silence in the old transcript only if both its sides come from one run
+        if 0 < i < len(kept) and run_ids[i - 1] == run_ids[i]:
+            continue
+        start = kept[i - 1]["end"] if i else 0.0
+        end = kept[i]["start"] if i < len(kept) else duration
+        if end > start:
+            regions.append((start, end))
+    return kept, regions
@@ -0,0 +1,372 @@
+import argparse
+import importlib
+import importlib.metadata
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from compact_transcript import SUFFIX as COMPACT_SUFFIX, CompactTranscript
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The CLI script's file name isn't a valid identifier, so it can't be imported with a plain import statement
+transcribe_video = importlib.import_module("transcribe-video")
+
+SAMPLE_RATE = transcribe_video.SAMPLE_RATE
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    models = commands.add_parser("models")
+    models.add_argument("--clip", type=Path, action="append", default=[])
+    models.add_argument("--synthetic-seconds", type=float, default=30)
+    models.add_argument("--model", action="append")
+    models.add_argument("--compute-type", action="append")
+    models.add_argument("--beam-size", type=int, action="append")
+    models.add_argument("--batch-size", type=int, action="append")
+    models.add_argument("--device", default="cpu")
+    models.add_argument("--output", type=Path)
+    models.add_argument("--baseline", type=Path)
+    models.add_argument("--tolerance", type=float, default=0.15)
+
+    autotune = commands.add_parser("autotune")
+    autotune.add_argument("--clip", type=Path, required=True)
+    autotune.add_argument(
+        "--reference", type=Path, required=True, help="plain text, or a transcript payload (.json or compact)")
+    autotune.add_argument("--model", default="large-v3-turbo")
+    autotune.add_argument("--device", default="cpu")
+    autotune.add_argument("--compute-type", action="append")
+    autotune.add_argument("--cpu-threads", type=int, action="append")
+    autotune.add_argument("--num-workers", type=int, action="append")
+    autotune.add_argument(
+        "--tolerance", type=float, default=0.01, help="WER allowed above the most accurate candidate's")
+    autotune.add_argument("--profile", type=Path, default=transcribe_video.DEFAULT_PROFILE)
+
+    paragraphs = commands.add_parser("paragraphs")
+    paragraphs.add_argument("--segments", type=int, default=200_000)
+    paragraphs.add_argument("--paragraph-seconds", type=float, default=35)
+    paragraphs.add_argument("--sentence-breaks", action="store_true")
+    args = parser.parse_args()
+    if args.command == "models":
+        args.model = args.model or ["large-v3-turbo"]
+        args.compute_type = args.compute_type or ["int8"]
+        args.beam_size = args.beam_size or [5]
+        args.batch_size = args.batch_size or [0]
+    if args.command == "autotune":
+        args.compute_type = args.compute_type or supported_compute_types(args.device)
+        cores = os.cpu_count() or 1
+        args.cpu_threads = args.cpu_threads or sorted({cores, max(1, cores // 2), min(cores, 4)})
+        args.num_workers = args.num_workers or [1]
+    return args
+
+
+def supported_compute_types(device: str) -> list[str]:
+    import ctranslate2
+
+    supported = ctranslate2.get_supported_compute_types(device)
+    preferred = ["int8", "int8_float32", "int8_float16", "int8_bfloat16", "int16", "float16", "bfloat16", "float32"]
+    return [compute_type for compute_type in preferred if compute_type in supported]
+
+
+def synthetic_clip(seconds: float, seed: int = 0) -> np.ndarray:
+    # Voiced bursts (harmonics shaped by two formants) separated by pauses: not words, but enough
+    # for the decoder to do real work without any fixture file or network access
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(round(seconds * SAMPLE_RATE), dtype=np.float32)
+    position = 0
+    while position < len(audio):
+        length = round(rng.uniform(0.3, 1.5) * SAMPLE_RATE)
+        t = np.arange(min(length, len(audio) - position)) / SAMPLE_RATE
+        f0 = rng.uniform(90, 220)
+        formants = rng.uniform(300, 900), rng.uniform(900, 2500)
+        burst = np.zeros_like(t)
+        for harmonic in range(1, 30):
+            frequency = f0 * harmonic
+            gain = sum(np.exp(-((frequency - f) / 150) ** 2) for f in formants) + 0.02
+            burst += gain * np.sin(2 * np.pi * frequency * t)
+        burst *= np.sin(np.pi * t / t[-1]) if len(t) > 1 else 0
+        audio[position:position + len(t)] = 0.3 * burst / (np.abs(burst).max() or 1)
+        position += len(t) + round(rng.uniform(0.1, 0.8) * SAMPLE_RATE)
+    return audio
+
+
+def load_clips(args: argparse.Namespace) -> list[tuple[str, np.ndarray, bool]]:
+    clips = [(str(path), transcribe_video.load_audio(path, None), True) for path in args.clip]
+    if not clips:
+        # VAD would rightly drop synthetic bursts as non-speech, so they're decoded without it
+        clips.append((f"synthetic-{args.synthetic_seconds:g}s", synthetic_clip(args.synthetic_seconds), False))
+    return clips
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / (1 << 10)
+
+
+def run_config(config: dict, clips: list[tuple[str, np.ndarray, bool]]) -> dict:
+    started = time.perf_counter()
+    model = transcribe_video.load_model(config["model"], config["device"], config["computeType"])
+    load_seconds = time.perf_counter() - started
+    audio_seconds = inference_seconds = 0.0
+    segment_count = 0
+    for _, audio, vad_filter in clips:
+        started = time.perf_counter()
+        segments, _ = transcribe_video.run_model(
+            model,
+            audio,
+            None,
+            beam_size=config["beamSize"],
+            vad_filter=vad_filter,
+            batch_size=config["batchSize"],
+        )
+        segment_count += sum(1 for _ in segments)
+        inference_seconds += time.perf_counter() - started
+        audio_seconds += len(audio) / SAMPLE_RATE
+    return {
+        **config,
+        "modelLoadSeconds": load_seconds,
+        "audioSeconds": audio_seconds,
+        "inferenceSeconds": inference_seconds,
+        "realTimeFactor": inference_seconds / audio_seconds,
+        "segments": segment_count,
+        "segmentsPerSecond": segment_count / inference_seconds if inference_seconds else 0.0,
+        "peakRssMb": peak_rss_mb(),
+    }
+
+
+def config_key(result: dict) -> tuple:
+    return result["model"], result["computeType"], result["beamSize"], result.get("batchSize", 0)
+
+
+def benchmark_models(args: argparse.Namespace) -> int:
+    clips = load_clips(args)
+    baseline = {}
+    if args.baseline is not None:
+        baseline = {config_key(r): r for r in json.loads(args.baseline.read_text(encoding="utf-8"))["results"]}
+
+    results = []
+    # A fresh process per configuration keeps peak RSS and model load time independent of earlier runs
+    context = multiprocessing.get_context("spawn")
+    sweep = itertools.product(args.model, args.compute_type, args.beam_size, args.batch_size)
+    for model, compute_type, beam_size, batch_size in sweep:
+        config = {
+            "model": model,
+            "computeType": compute_type,
+            "beamSize": beam_size,
+            "batchSize": batch_size,
+            "device": args.device,
+        }
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            results.append(pool.submit(run_config, config, clips).result())
+
+    regressions = 0
+    header = (
+        f"{'model':<18} {'compute':<9} {'beam':>4} {'batch':>5} "
+        f"{'load s':>7} {'RTF':>7} {'seg/s':>7} {'RSS MB':>8}  baseline"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = (
+            f"{r['model']:<18} {r['computeType']:<9} {r['beamSize']:>4} {r['batchSize']:>5} "
+            f"{r['modelLoadSeconds']:>7.2f} "
+            f"{r['realTimeFactor']:>7.3f} {r['segmentsPerSecond']:>7.1f} {r['peakRssMb'] or 0:>8.0f}"
+        )
+        if (old := baseline.get(config_key(r))) is not None:
+            change = r["realTimeFactor"] / old["realTimeFactor"] - 1
+            regressed = change > args.tolerance
+            regressions += regressed
+            line += f"  {change:+.0%}{' REGRESSION' if regressed else ''}"
+        print(line)
+
+    if args.output is not None:
+        report = {
+            "host": {
+                "platform": platform.platform(),
+                "processor": platform.processor(),
+                "python": platform.python_version(),
+                "fasterWhisper": importlib.metadata.version("faster-whisper"),
+            },
+            "clips": [{"name": name, "seconds": len(audio) / SAMPLE_RATE} for name, audio, _ in clips],
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8", newline="\n")
+    return 1 if regressions else 0
+
+
+def words(text: str) -> list[str]:
+    return re.findall(r"[\w']+", text.lower())
+
+
+def word_error_rate(reference: list[str], hypothesis: list[str]) -> float:
+    # Word-level Levenshtein distance, one row at a time
+    previous = list(range(len(hypothesis) + 1))
+    for i, word in enumerate(reference, 1):
+        current = [i]
+        for j, other in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other)))
+        previous = current
+    return previous[-1] / max(1, len(reference))
+
+
+def read_reference(path: Path) -> str:
+    if path.suffix == COMPACT_SUFFIX:
+        with CompactTranscript(path) as transcript:
+            return " ".join(segment["text"] for segment in transcript)
+    if path.suffix == ".json":
+        return " ".join(segment["text"] for segment in json.loads(path.read_text(encoding="utf-8"))["segments"])
+    return path.read_text(encoding="utf-8")
+
+
+def run_candidate(config: dict, audio: np.ndarray, reference: list[str]) -> dict:
+    started = time.perf_counter()
+    model = transcribe_video.load_model(
+        config["model"], config["device"], config["computeType"], config["cpuThreads"], config["numWorkers"])
+    load_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    segments, _ = transcribe_video.run_model(model, audio, None)
+    text = " ".join(segment["text"] for segment in segments)
+    inference_seconds = time.perf_counter() - started
+    return {
+        **config,
+        "modelLoadSeconds": load_seconds,
+        "realTimeFactor": inference_seconds / (len(audio) / SAMPLE_RATE),
+        "wer": word_error_rate(reference, words(text)),
+    }
+
+
+def autotune(args: argparse.Namespace) -> int:
+    audio = transcribe_video.load_audio(args.clip, None)
+    reference = words(read_reference(args.reference))
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for compute_type, cpu_threads, num_workers in itertools.product(
+            args.compute_type, args.cpu_threads, args.num_workers):
+        config = {
+            "model": args.model,
+            "device": args.device,
+            "computeType": compute_type,
+            "cpuThreads": cpu_threads,
+            "numWorkers": num_workers,
+        }
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            try:
+                results.append(pool.submit(run_candidate, config, audio, reference).result())
+            except Exception as e:  # E.g. a compute type the CPU lacks instructions for
+                print(f"skipped {compute_type}, {cpu_threads} threads, {num_workers} workers: {e}", file=sys.stderr)
+    if not results:
+        print("No candidate configuration ran", file=sys.stderr)
+        return 1
+
+    # The accuracy bar is relative to the best candidate, so it doesn't depend on how the reference was made
+    bar = min(r["wer"] for r in results) + args.tolerance
+    best = min((r for r in results if r["wer"] <= bar), key=lambda r: r["realTimeFactor"])
+    header = f"{'compute':<14} {'threads':>7} {'workers':>7} {'load s':>7} {'RTF':>7} {'WER':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in sorted(results, key=lambda r: r["realTimeFactor"]):
+        mark = "  <- selected" if r is best else "" if r["wer"] <= bar else "  above accuracy bar"
+        print(
+            f"{r['computeType']:<14} {r['cpuThreads']:>7} {r['numWorkers']:>7} "
+            f"{r['modelLoadSeconds']:>7.2f} {r['realTimeFactor']:>7.3f} {r['wer']:>7.2%}{mark}"
+        )
+
+    profile = {
+        **{key: best[key] for key in ("model", "device", "computeType", "cpuThreads", "numWorkers")},
+        "realTimeFactor": best["realTimeFactor"],
+        "wer": best["wer"],
+        "clip": str(args.clip.resolve()),
+        "tunedAt": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    transcribe_video.write_profile(args.profile, profile)
+    print(f"Saved {args.model} on {args.device} to {args.profile}")
+    return 0
+
+
+def synthetic_segments(count: int, seed: int = 0) -> Iterator[dict]:
+    rng = random.Random(seed)
+    words = "fusion computed state invalidation replica client server cache graph dependency".split()
+    start = 0.0
+    for _ in range(count):
+        end = start + rng.uniform(1, 6)
+        text = " ".join(rng.choices(words, k=rng.randint(3, 14)))
+        yield {"start": start, "end": end, "text": text + rng.choice([".", ",", "", "?"])}
+        start = end + rng.uniform(0, 0.5)
+
+
+def legacy_markdown(path: Path, video_id: str, segments: Iterable[dict], paragraph_seconds: float) -> None:
+    # The pre-streaming implementation: materialized segments, += concatenation, one write_text
+    segments = list(segments)
+    paragraphs: list[dict] = []
+    current: dict | None = None
+    for segment in segments:
+        if current is None or segment["end"] - current["start"] > paragraph_seconds:
+            current = {"start": segment["start"], "end": segment["end"], "text": segment["text"]}
+            paragraphs.append(current)
+        else:
+            current["end"] = segment["end"]
+            current["text"] += " " + segment["text"]
+    markdown: list[str] = []
+    for paragraph in paragraphs:
+        timestamp = transcribe_video.format_timestamp(paragraph["start"])
+        url = f"https://www.youtube.com/watch?v={video_id}&t={round(paragraph['start'])}s"
+        markdown += [f"[{timestamp}]({url})", paragraph["text"], ""]
+    path.write_text("\n".join(markdown), encoding="utf-8", newline="\n")
+
+
+def measure(write: Callable[[], None]) -> tuple[float, float]:
+    started = time.perf_counter()
+    write()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    write()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1 << 20)
+
+
+def benchmark_paragraphs(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as temp:
+        path = Path(temp) / "transcript.md"
+        count, seconds = args.segments, args.paragraph_seconds
+        results = {
+            "legacy": measure(lambda: legacy_markdown(path, "id", synthetic_segments(count), seconds)),
+            "streaming": measure(lambda: transcribe_video.write_markdown(
+                path, "id", synthetic_segments(count), seconds, args.sentence_breaks)),
+        }
+    print(f"{count} segments, {seconds:g}s paragraphs")
+    for name, (elapsed, peak) in results.items():
+        print(f"{name:<10} {elapsed:>8.3f}s {count / elapsed:>12,.0f} segments/s {peak:>8.1f} MiB peak")
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "models":
+        sys.exit(benchmark_models(args))
+    if args.command == "autotune":
+        sys.exit(autotune(args))
+    if args.command == "paragraphs":
+        benchmark_paragraphs(args)
+
+
+if __name__ == "__main__":
+    main()
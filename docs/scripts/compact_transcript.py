@@ -0,0 +1,120 @@
+"""Compact columnar transcript format with a memory-mapped, lazily decoding reader.
+
+Layout (little-endian): magic, version, header size, segment count, then the JSON header
+(the transcript payload without "segments"), then 8-byte aligned columns: float64 starts,
+float64 ends, uint32 text offsets (count + 1 of them), and finally a single UTF-8 text blob.
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+SUFFIX = ".ctrans"
+MAGIC = b"FTRN"
+VERSION = 1
+PREAMBLE = struct.Struct("<4sIII")
+
+if sys.byteorder != "little":
+    raise ImportError("compact_transcript maps its columns in place and requires a little-endian host")
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def write_compact(path: Path, header: dict, segments: Iterable[dict]) -> None:
+    starts, ends, offsets = array("d"), array("d"), array("I", [0])
+    texts: list[bytes] = []
+    size = 0
+    for segment in segments:
+        text = segment["text"].encode("utf-8")
+        starts.append(segment["start"])
+        ends.append(segment["end"])
+        texts.append(text)
+        size += len(text)
+        offsets.append(size)
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    with path.open("wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header_bytes), len(starts)))
+        f.write(header_bytes)
+        f.write(b"\0" * (_align(f.tell()) - f.tell()))
+        starts.tofile(f)
+        ends.tofile(f)
+        offsets.tofile(f)
+        f.writelines(texts)
+
+
+class CompactTranscript:
+    def __init__(self, path: Path):
+        with path.open("rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_size, count = PREAMBLE.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} compact transcript")
+        position = PREAMBLE.size
+        self.header: dict = json.loads(self._map[position:position + header_size])
+        view = memoryview(self._map)
+        position = _align(position + header_size)
+        self.starts = view[position:position + 8 * count].cast("d")
+        position += 8 * count
+        self.ends = view[position:position + 8 * count].cast("d")
+        position += 8 * count
+        self._offsets = view[position:position + 4 * (count + 1)].cast("I")
+        self._text = view[position + 4 * (count + 1):]
+
+    def __enter__(self) -> "CompactTranscript":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for view in (self.starts, self.ends, self._offsets, self._text):
+            view.release()
+        self._map.close()
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: int) -> dict:
+        if index < 0:
+            index += len(self)
+        return {"start": self.starts[index], "end": self.ends[index], "text": self.text(index)}
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self[i] for i in range(len(self)))
+
+    def text(self, index: int) -> str:
+        return str(self._text[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def index_at(self, seconds: float) -> int:
+        """Index of the last segment starting at or before ``seconds`` (-1 if there's none)."""
+        return bisect_right(self.starts, seconds) - 1
+
+
+def convert(source: Path) -> Path:
+    payload = json.loads(source.read_text(encoding="utf-8"))
+    segments = payload.pop("segments")
+    target = source.with_suffix(SUFFIX)
+    write_compact(target, payload, segments)
+    return target
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert transcript JSON payloads to the compact format")
+    parser.add_argument("inputs", type=Path, nargs="+")
+    args = parser.parse_args()
+    for source in args.inputs:
+        target = convert(source)
+        print(f"{source} ({source.stat().st_size} bytes) -> {target} ({target.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+# Deliberately free of heavy imports: this is what scripts call instead of transcribe-video.py
+# when a "transcribe-video.py --serve" process keeps the model warm.
+DEFAULT_SOCKET = Path(os.environ.get("TRANSCRIBE_SOCKET", Path(tempfile.gettempdir()) / "transcribe-video.sock"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [--socket SOCKET] <transcribe-video.py arguments>",
+        description="Submit a transcribe-video.py job to a running transcribe-video.py --serve process.",
+    )
+    parser.add_argument("--socket", type=Path, default=DEFAULT_SOCKET)
+    args, argv = parser.parse_known_args()
+
+    failed = False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(args.socket))
+        request = {"argv": argv, "cwd": os.getcwd()}
+        connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        for line in connection.makefile("r", encoding="utf-8"):
+            event = json.loads(line)
+            print(event["message"], flush=True)
+            failed |= event["event"] in ("rejected", "failed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,379 @@
+from __future__ import annotations
+
 import argparse
+import bisect
+import functools
+import hashlib
 import json
+import os
+import platform
+import shutil
+import socketserver
+import sys
+import tempfile
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, TextIO
+
+# numpy and faster_whisper take seconds to import, so they're imported where they're used:
+# --help, --dry-run and argument or file errors don't pay for them
+if TYPE_CHECKING:
+    import numpy as np
+    from faster_whisper import WhisperModel
+    from faster_whisper.transcribe import TranscriptionInfo
+
+SAMPLE_RATE = 16000
+RESUME_PROMPT_CHARS = 200
+PROGRESS_INTERVAL = 5.0
+SENTENCE_ENDS = (".", "?", "!", "\u2026")
+SIZE_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+DEFAULT_SOCKET = Path(os.environ.get("TRANSCRIBE_SOCKET", Path(tempfile.gettempdir()) / "transcribe-video.sock"))
+MODEL_OPTIONS = ("model", "device", "compute_type", "cpu_threads", "num_workers")
+PATH_OPTIONS = ("input", "output", "manifest", "prompt_file", "cache_dir", "profile")
+# Options an autotune profile can supply, with their profile keys and the defaults used without one
+TUNED_OPTIONS = {
+    "compute_type": ("computeType", "int8"),
+    "cpu_threads": ("cpuThreads", 0),
+    "num_workers": ("numWorkers", 1),
+}
+DEFAULT_PROFILE = Path(os.environ.get(
+    "TRANSCRIBE_PROFILE", Path.home() / ".config" / "transcribe-video" / f"{platform.node() or 'host'}.json"))
+FINGERPRINT_SUFFIX = ".fingerprint.npy"
+COMPACT_SUFFIX = ".ctrans"  # compact_transcript.SUFFIX; that module only imports on little-endian hosts
+
+
+@dataclass
+class Job:
+    input: Path
+    video_id: str
+    output: Path
+    prompt_file: Path | None = None
+
+
+@dataclass
+class Checkpoint:
+    header: dict
+    end: float
+    tail_text: str
+    size: int
+
+
+class Cache:
+    def __init__(self, root: Path, max_size: int | None = None):
+        self.root = root
+        self.max_size = max_size
+
+    def transcript_path(self, key: str) -> Path:
+        return self.root / "transcripts" / f"{key}.jsonl"
+
+    def get_transcript(self, key: str) -> Path | None:
+        return self._hit(self.transcript_path(key))
+
+    @staticmethod
+    def _hit(path: Path) -> Path | None:
+        try:
+            os.utime(path)  # mtime is the LRU clock; unlike touch(), doesn't recreate an evicted file
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put_transcript(self, key: str, source: Path) -> None:
+        path = self.transcript_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_suffix(f".{os.getpid()}.tmp")
+        shutil.move(source, temp)
+        os.replace(temp, path)
+        self.evict()
+
+    def pcm_path(self, key: str) -> Path:
+        return self.root / "pcm" / f"{key}.f32"
+
+    def get_pcm(self, key: str) -> Path | None:
+        return self._hit(self.pcm_path(key))
+
+    def put_pcm(self, key: str, audio: np.ndarray) -> Path:
+        import numpy as np
+
+        path = self.pcm_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_suffix(f".{os.getpid()}.tmp")
+        audio.astype(np.float32, copy=False).tofile(temp)
+        os.replace(temp, path)
+        self.evict()
+        return path
+
+    def files(self) -> list[tuple[Path, os.stat_result]]:
+        # Other processes may be writing *.tmp files or evicting entries while this one lists them
+        files = []
+        for path in self.root.rglob("*"):
+            if path.suffix == ".tmp" or not path.is_file():
+                continue
+            try:
+                files.append((path, path.stat()))
+            except FileNotFoundError:
+                pass
+        return files
+
+    def entries(self) -> list[os.stat_result]:
+        return [stat for _, stat in self.files()]
 
-from faster_whisper import WhisperModel
+    def evict(self) -> int:
+        """Best effort: an entry that can't be removed is left for a later eviction."""
+        if self.max_size is None:
+            return 0
+        files = sorted(self.files(), key=lambda item: item[1].st_mtime)
+        total = sum(stat.st_size for _, stat in files)
+        evicted = 0
+        for path, stat in files:
+            if total <= self.max_size:
+                break
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                continue
+            total -= stat.st_size
+            evicted += 1
+        return evicted
 
+    def print_stats(self) -> None:
+        entries = self.entries()
+        total = sum(stat.st_size for stat in entries)
+        limit = "unlimited" if self.max_size is None else f"{self.max_size / (1 << 20):.1f} MiB"
+        print(f"Cache: {self.root}")
+        print(f"Entries: {len(entries)}, size: {total / (1 << 20):.1f} MiB, limit: {limit}")
+        if entries:
+            oldest = min(stat.st_mtime for stat in entries)
+            newest = max(stat.st_mtime for stat in entries)
+            print(f"Last used: {time.ctime(oldest)} .. {time.ctime(newest)}")
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("input", type=Path)
-    parser.add_argument("--video-id", required=True)
-    parser.add_argument("--output", type=Path, required=True)
+
+class Metrics:
+    def __init__(self, label: str, enabled: bool):
+        self.label = label
+        self.enabled = enabled
+        self.stages: dict[str, float] = {}
+        self.values: dict[str, object] = {}
+        self._reported_at = 0.0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def progress(self, position: float, start: float, duration: float, started: float) -> None:
+        now = time.perf_counter()
+        if not self.enabled or now - self._reported_at < PROGRESS_INTERVAL:
+            return
+        self._reported_at = now
+        done = position - start
+        rtf = (now - started) / done if done > 0 else 0.0
+        eta = (duration - position) * rtf
+        print(
+            f"{self.label}: {format_timestamp(position)} / {format_timestamp(duration)} "
+            f"({position / duration:.0%}), RTF {rtf:.3f}, ETA {format_timestamp(eta)}",
+            file=sys.stderr,
+        )
+
+    def write(self, path: Path) -> None:
+        if not self.enabled:
+            return
+        summary = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.stages.items())
+        print(f"{self.label}: {summary}", file=sys.stderr)
+        payload = {**self.values, "stages": self.stages}
+        path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8", newline="\n")
+
+
+def parse_size(value: str) -> int:
+    unit = SIZE_UNITS.get(value[-1:].upper())
+    return round(float(value[:-1]) * unit) if unit else int(value)
+
+
+class JobArgumentError(Exception):
+    pass
+
+
+class InvalidJob(Exception):
+    pass
+
+
+class JobArgumentParser(argparse.ArgumentParser):
+    def error(self, message: str):
+        raise JobArgumentError(message)
+
+
+def parse_args(
+    argv: list[str] | None = None,
+    parser_type: type[argparse.ArgumentParser] = argparse.ArgumentParser,
+    defaults: dict | None = None,
+) -> argparse.Namespace:
+    parser = parser_type()
+    parser.add_argument("input", type=Path, nargs="?")
+    parser.add_argument("--video-id")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--manifest", type=Path)
+    parser.add_argument("--jobs", type=int, default=1)
     parser.add_argument("--model", default="large-v3-turbo")
     parser.add_argument("--device", default="cpu")
-    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--compute-type", help="default: the host profile's, else int8")
+    parser.add_argument("--cpu-threads", type=int, help="default: the host profile's, else all cores")
+    parser.add_argument("--num-workers", type=int, help="default: the host profile's, else 1")
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=DEFAULT_PROFILE,
+        help="host profile written by benchmark-transcription.py autotune (default: %(default)s)",
+    )
+    parser.add_argument("--no-profile", action="store_true")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=0,
+        help="decode VAD-split windows in batches of this size (faster-whisper's batched pipeline, 1.1 or later). "
+        "Several times the throughput on many-core CPUs, but windows are decoded without "
+        "previous-text context, so punctuation and names drift slightly more across window "
+        "boundaries. 0 (default) keeps the sequential decoder.",
+    )
     parser.add_argument("--prompt-file", type=Path)
     parser.add_argument("--paragraph-seconds", type=float, default=35)
-    return parser.parse_args()
+    parser.add_argument("--sentence-breaks", action="store_true")
+    parser.add_argument("--format", choices=["json", "compact", "both"], default="json")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="keep an audio fingerprint next to the outputs; when the input is re-cut later, only the regions "
+        "that changed since the previous outputs are transcribed again",
+    )
+    parser.add_argument("--chunk-workers", type=int, default=1)
+    parser.add_argument(
+        "--compare-sequential",
+        action="store_true",
+        help="with --chunk-workers, also time a sequential run to measure the real speedup",
+    )
+    parser.add_argument("--metrics", action="store_true")
+    parser.add_argument("--cache-dir", type=Path)
+    parser.add_argument("--cache-max-size", type=parse_size)
+    parser.add_argument("--cache-stats", action="store_true")
+    parser.add_argument("--serve", type=Path, nargs="?", const=DEFAULT_SOCKET)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="check the job or manifest and exit without transcribing")
+    parser.set_defaults(**(defaults or {}))
+    args = parser.parse_args(argv)
+    has_job = args.manifest is not None or None not in (args.input, args.video_id, args.output)
+    if args.cache_stats and args.cache_dir is None:
+        parser.error("--cache-stats requires --cache-dir")
+    if not (has_job or args.cache_stats or args.serve is not None):
+        parser.error("input, --video-id and --output are required unless --manifest is used")
+    if args.jobs < 1 or args.chunk_workers < 1:
+        parser.error("--jobs and --chunk-workers must be positive")
+    if args.jobs > 1 and args.chunk_workers > 1:
+        parser.error("--jobs and --chunk-workers can't be combined")
+    if args.incremental and args.chunk_workers > 1:
+        parser.error("--incremental and --chunk-workers can't be combined")
+    if args.dry_run and not has_job:
+        parser.error("--dry-run requires a job or --manifest")
+    try:
+        tuned = {} if args.no_profile else read_profile(args.profile, args.model, args.device)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(f"can't read profile {args.profile}: {e!r}")
+    if args.jobs > 1 or args.chunk_workers > 1:
+        tuned.pop("cpuThreads", None)  # Profiles are tuned for one process; pools split the cores themselves
+    for name, (key, default) in TUNED_OPTIONS.items():
+        if getattr(args, name) is None:
+            setattr(args, name, tuned.get(key, default))
+    return args
+
+
+def read_profile(path: Path, model: str, device: str) -> dict:
+    if not path.exists():
+        return {}
+    profiles = json.loads(path.read_text(encoding="utf-8"))["profiles"]
+    return next((p for p in profiles if (p["model"], p["device"]) == (model, device)), {})
+
+
+def write_profile(path: Path, profile: dict) -> None:
+    profiles = json.loads(path.read_text(encoding="utf-8"))["profiles"] if path.exists() else []
+    profiles = [p for p in profiles if (p["model"], p["device"]) != (profile["model"], profile["device"])]
+    payload = {"host": platform.node(), "profiles": [*profiles, profile]}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8", newline="\n")
+
+
+def read_manifest(path: Path) -> list[Job]:
+    # Relative paths in the manifest are resolved against its own directory
+    base = path.parent
+    entries = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(entries, list):
+        raise ValueError(f"{path}: expected a list of jobs")
+    jobs: list[Job] = []
+    for i, entry in enumerate(entries):
+        missing = [key for key in ("input", "videoId", "output") if not isinstance(entry, dict) or not entry.get(key)]
+        if missing:
+            raise ValueError(f"{path}: job {i} has no {', '.join(missing)}")
+        prompt_file = entry.get("promptFile")
+        jobs.append(Job(
+            input=base / entry["input"],
+            video_id=entry["videoId"],
+            output=base / entry["output"],
+            prompt_file=base / prompt_file if prompt_file else None,
+        ))
+    return jobs
+
+
+def check_file(path: Path, name: str) -> str | None:
+    if not path.is_file():
+        return f"{name} {path} doesn't exist"
+    if not os.access(path, os.R_OK):
+        return f"{name} {path} isn't readable"
+    return None
+
+
+def check_directory(path: Path, name: str) -> str | None:
+    # Output and cache directories are created on demand, so it's their nearest existing ancestor that must be writable
+    existing = path
+    while not existing.exists():
+        existing = existing.parent
+    if not existing.is_dir():
+        return f"{name} {path} can't be created: {existing} isn't a directory"
+    if not os.access(existing, os.W_OK | os.X_OK):
+        return f"{name} {path} isn't writable"
+    return None
+
+
+def check_jobs(jobs: list[Job], args: argparse.Namespace) -> tuple[list[list[str]], list[str]]:
+    """The problems of each job, and the problems that affect every job."""
+    job_problems = []
+    outputs: dict[Path, str] = {}
+    for job in jobs:
+        checks = [
+            check_file(job.input, "input"),
+            check_file(job.prompt_file, "prompt file") if job.prompt_file is not None else None,
+            check_directory(job.output.parent, "output directory"),
+        ]
+        problems = [problem for problem in checks if problem is not None]
+        output = job.output.resolve()
+        if output in outputs:
+            problems.append(f"output {job.output} is also written by {outputs[output]}")
+        outputs.setdefault(output, job.video_id)
+        job_problems.append(problems)
+    shared = []
+    if args.cache_dir is not None and (problem := check_directory(args.cache_dir, "cache directory")):
+        shared.append(problem)
+    return job_problems, shared
+
+
+def describe_problems(jobs: list[Job], job_problems: list[list[str]], shared: list[str]) -> list[str]:
+    return shared + [f"{job.video_id}: {problem}" for job, problems in zip(jobs, job_problems) for problem in problems]
 
 
 def format_timestamp(seconds: float) -> str:
@@ -27,73 +385,735 @@ def format_timestamp(seconds: float) -> str:
     return f"{minutes:02}:{seconds:02}"
 
 
-def group_segments(segments: list[dict], paragraph_seconds: float) -> list[dict]:
-    paragraphs: list[dict] = []
-    current: dict | None = None
+def ends_sentence(text: str) -> bool:
+    return text.rstrip("\"')\u201d\u2019").endswith(SENTENCE_ENDS)
+
+
+def make_paragraph(segments: list[dict]) -> dict:
+    return {
+        "start": segments[0]["start"],
+        "end": segments[-1]["end"],
+        "text": " ".join(segment["text"] for segment in segments),
+    }
+
+
+def iter_paragraphs(
+    segments: Iterable[dict],
+    paragraph_seconds: float,
+    sentence_breaks: bool = False,
+) -> Iterator[dict]:
+    # With sentence_breaks, an overflowing paragraph is cut after its last sentence end (if any),
+    # and the remaining segments open the next one
+    current: list[dict] = []
+    sentence_end = 0
     for segment in segments:
-        if current is None or segment["end"] - current["start"] > paragraph_seconds:
-            current = {
-                "start": segment["start"],
-                "end": segment["end"],
-                "text": segment["text"],
-            }
-            paragraphs.append(current)
-        else:
-            current["end"] = segment["end"]
-            current["text"] += " " + segment["text"]
-    return paragraphs
+        if current and segment["end"] - current[0]["start"] > paragraph_seconds:
+            split = sentence_end if sentence_breaks and sentence_end else len(current)
+            yield make_paragraph(current[:split])
+            current = current[split:]
+            sentence_end = 0
+            if current and segment["end"] - current[0]["start"] > paragraph_seconds:
+                yield make_paragraph(current)
+                current = []
+        current.append(segment)
+        if ends_sentence(segment["text"]):
+            sentence_end = len(current)
+    if current:
+        yield make_paragraph(current)
 
 
-def main() -> None:
-    args = parse_args()
-    initial_prompt = args.prompt_file.read_text(encoding="utf-8") if args.prompt_file else None
-    model = WhisperModel(args.model, device=args.device, compute_type=args.compute_type)
-    result, info = model.transcribe(
-        str(args.input),
-        language="en",
-        beam_size=5,
-        vad_filter=True,
-        condition_on_previous_text=True,
-        initial_prompt=initial_prompt,
+def sidecar_path(job: Job) -> Path:
+    return job.output.with_suffix(".segments.jsonl")
+
+
+def iter_sidecar(path: Path) -> Iterator[dict]:
+    with path.open(encoding="utf-8") as f:
+        yield from read_records(f)
+
+
+def read_records(f: TextIO) -> Iterator[dict]:
+    f.seek(0)
+    for line in f:
+        if not line.endswith("\n"):
+            return  # A torn write from an interrupted run
+        yield json.loads(line)
+
+
+def read_sidecar_segments(path: Path) -> Iterator[dict]:
+    return islice(iter_sidecar(path), 1, None)
+
+
+def read_checkpoint(path: Path) -> Checkpoint | None:
+    if not path.exists():
+        return None
+    header: dict | None = None
+    end = 0.0
+    size = 0
+    tail: deque[str] = deque(maxlen=8)
+    with path.open("rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            record = json.loads(line)
+            size += len(line)
+            if header is None:
+                header = record
+            else:
+                end = record["end"]
+                tail.append(record["text"])
+    if header is None:
+        return None
+    return Checkpoint(header, end, " ".join(tail)[-RESUME_PROMPT_CHARS:], size)
+
+
+def checkpoint_mismatches(header: dict, job: Job, args: argparse.Namespace, duration: float) -> list[str]:
+    # The language is detected rather than set, so a resumed run keeps the checkpoint's
+    expected = {"input": str(job.input), "videoId": job.video_id, "model": args.model}
+    mismatched = [key for key, value in expected.items() if header.get(key) != value]
+    if abs(header.get("duration", -1.0) - duration) > 1 / SAMPLE_RATE:
+        mismatched.append("duration")
+    return mismatched
+
+
+def write_payload(path: Path, header: dict, segments: Iterable[dict]) -> None:
+    # Produces exactly what json.dumps(payload, indent=2) would, without materializing the segment list
+    head = json.dumps({**header, "segments": []}, ensure_ascii=False, indent=2)
+    with path.open("w", encoding="utf-8", newline="\n") as f:
+        f.write(head[:-len("[]\n}")])
+        separator = "[\n"
+        for segment in segments:
+            f.write(separator)
+            f.write("    " + json.dumps(segment, ensure_ascii=False, indent=2).replace("\n", "\n    "))
+            separator = ",\n"
+        f.write("[]" if separator == "[\n" else "\n  ]")
+        f.write("\n}\n")
+
+
+def write_markdown(
+    path: Path,
+    video_id: str,
+    segments: Iterable[dict],
+    paragraph_seconds: float,
+    sentence_breaks: bool = False,
+) -> None:
+    with path.open("w", encoding="utf-8", newline="\n") as f:
+        separator = ""
+        for paragraph in iter_paragraphs(segments, paragraph_seconds, sentence_breaks):
+            timestamp = format_timestamp(paragraph["start"])
+            url = f"https://www.youtube.com/watch?v={video_id}&t={round(paragraph['start'])}s"
+            f.write(f"{separator}[{timestamp}]({url})\n{paragraph['text']}\n")
+            separator = "\n"
+
+
+def write_outputs(
+    job: Job,
+    header: dict,
+    read_segments: Callable[[], Iterable[dict]],
+    args: argparse.Namespace,
+    metrics: Metrics,
+) -> None:
+    if args.format != "compact":
+        with metrics.stage("writeJson"):
+            write_payload(job.output.with_suffix(".json"), header, read_segments())
+    if args.format != "json":
+        from compact_transcript import write_compact
+
+        with metrics.stage("writeCompact"):
+            write_compact(job.output.with_suffix(COMPACT_SUFFIX), header, read_segments())
+    with metrics.stage("writeMarkdown"):
+        write_markdown(
+            job.output.with_suffix(".md"),
+            job.video_id,
+            read_segments(),
+            args.paragraph_seconds,
+            args.sentence_breaks,
+        )
+
+
+def read_previous(job: Job, model: str) -> tuple[dict, list[dict], np.ndarray] | None:
+    import numpy as np
+
+    fingerprint = job.output.with_suffix(FINGERPRINT_SUFFIX)
+    json_path, compact_path = job.output.with_suffix(".json"), job.output.with_suffix(COMPACT_SUFFIX)
+    # A run writes only its --format, so a sibling in the other format can be left over from older audio
+    written = [path for path in (json_path, compact_path) if path.exists()]
+    if not fingerprint.exists() or not written:
+        return None
+    latest = max(written, key=lambda path: path.stat().st_mtime_ns)
+    if latest == json_path:
+        header = json.loads(json_path.read_text(encoding="utf-8"))
+        segments = header.pop("segments")
+    else:
+        from compact_transcript import CompactTranscript
+
+        with CompactTranscript(compact_path) as transcript:
+            header, segments = dict(transcript.header), list(transcript)
+    if header.get("model") != model:
+        return None
+    return header, segments, np.load(fingerprint)
+
+
+def write_fingerprint(job: Job, fingerprint: np.ndarray | None) -> None:
+    # The fingerprint must describe the audio the current outputs were made from, so runs without one drop it
+    path = job.output.with_suffix(FINGERPRINT_SUFFIX)
+    if fingerprint is None:
+        path.unlink(missing_ok=True)
+        return
+    import numpy as np
+
+    np.save(path, fingerprint)
+
+
+def load_model(
+    model: str,
+    device: str,
+    compute_type: str,
+    cpu_threads: int = 0,
+    num_workers: int = 1,
+) -> WhisperModel:
+    from faster_whisper import WhisperModel
+
+    return WhisperModel(
+        model,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        num_workers=num_workers,
     )
-    segments = [
+
+
+def model_args(args: argparse.Namespace, pool_size: int = 0) -> tuple[str, str, str, int, int]:
+    # Unless --cpu-threads is given, pool workers split the cores so they don't oversubscribe them
+    cpu_threads = args.cpu_threads or (max(1, (os.cpu_count() or 1) // pool_size) if pool_size else 0)
+    return args.model, args.device, args.compute_type, cpu_threads, args.num_workers
+
+
+def cache_key(audio, args: argparse.Namespace, initial_prompt: str | None) -> str:
+    digest = hashlib.sha256(audio)
+    parts = [args.model, args.compute_type, initial_prompt or ""]
+    if args.chunk_workers > 1:
+        parts.append(f"chunks={args.chunk_workers}")
+    if args.batch_size:
+        parts.append(f"batch={args.batch_size}")
+    for part in parts:
+        digest.update(b"\0" + part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def pcm_key(path: Path) -> str:
+    stat = path.stat()
+    identity = f"{path.resolve()}\0{stat.st_size}\0{stat.st_mtime_ns}"
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def map_pcm(path: Path, start: int = 0, end: int | None = None) -> np.ndarray:
+    import numpy as np
+
+    # Copy-on-write mapping: pages are shared between processes and runs unless the model writes to them
+    if path.stat().st_size == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode="c")[start:end]
+
+
+def load_audio(path: Path, cache: Cache | None) -> np.ndarray:
+    from faster_whisper import decode_audio
+
+    if cache is None:
+        return decode_audio(str(path), sampling_rate=SAMPLE_RATE)
+    key = pcm_key(path)
+    pcm = cache.get_pcm(key)
+    if pcm is None:
+        audio = decode_audio(str(path), sampling_rate=SAMPLE_RATE)
+        pcm = cache.put_pcm(key, audio)
+    else:
+        audio = None
+    try:
+        return map_pcm(pcm)
+    except FileNotFoundError:  # evicted by another job in between
+        return decode_audio(str(path), sampling_rate=SAMPLE_RATE) if audio is None else audio
+
+
+def run_model(
+    model: WhisperModel,
+    audio,
+    initial_prompt: str | None,
+    offset: float = 0.0,
+    beam_size: int = 5,
+    vad_filter: bool = True,
+    batch_size: int = 0,
+) -> tuple[Iterator[dict], TranscriptionInfo]:
+    if batch_size:
+        from faster_whisper import BatchedInferencePipeline  # faster-whisper >= 1.1
+
+        # Batched windows are decoded independently, so previous-text conditioning doesn't apply
+        result, info = BatchedInferencePipeline(model).transcribe(
+            audio,
+            language="en",
+            beam_size=beam_size,
+            vad_filter=vad_filter,
+            initial_prompt=initial_prompt,
+            batch_size=batch_size,
+        )
+    else:
+        result, info = model.transcribe(
+            audio,
+            language="en",
+            beam_size=beam_size,
+            vad_filter=vad_filter,
+            condition_on_previous_text=True,
+            initial_prompt=initial_prompt,
+        )
+    segments = (
         {
-            "start": segment.start,
-            "end": segment.end,
+            "start": segment.start + offset,
+            "end": segment.end + offset,
             "text": segment.text.strip(),
         }
         for segment in result
-    ]
-
-    args.output.parent.mkdir(parents=True, exist_ok=True)
-    payload = {
-        "input": str(args.input),
-        "videoId": args.video_id,
-        "model": args.model,
-        "language": info.language,
-        "languageProbability": info.language_probability,
-        "duration": info.duration,
-        "segments": segments,
-    }
-    args.output.with_suffix(".json").write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2) + "\n",
-        encoding="utf-8",
-        newline="\n",
     )
+    return segments, info
+
+
+def split_at_silences(audio, chunk_count: int) -> list[tuple[int, int]]:
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    speech = get_speech_timestamps(audio, VadOptions())
+    gaps = [(a["end"] + b["start"]) // 2 for a, b in zip(speech, speech[1:])]
+    cuts = [0]
+    for i in range(1, chunk_count):
+        target = len(audio) * i // chunk_count
+        j = bisect.bisect_left(gaps, target)
+        nearest = min(gaps[max(0, j - 1):j + 1], key=lambda gap: abs(gap - target), default=None)
+        if nearest is not None and nearest > cuts[-1]:
+            cuts.append(nearest)
+    cuts.append(len(audio))
+    return list(zip(cuts, cuts[1:]))
+
+
+def splice_segments(
+    get_model: Callable[[], WhisperModel],
+    audio,
+    kept: list[dict],
+    regions: list[tuple[float, float]],
+    initial_prompt: str | None,
+    batch_size: int,
+) -> Iterator[dict]:
+    # Like a resumed run, each region is prompted with the text that precedes it
+    model = None
+    tail: deque[str] = deque(maxlen=8)
+    position = 0
+    for start, end in regions:
+        while position < len(kept) and kept[position]["start"] < start:
+            tail.append(kept[position]["text"])
+            yield kept[position]
+            position += 1
+        if model is None:
+            model = get_model()
+        prompt = " ".join(filter(None, [initial_prompt, " ".join(tail)[-RESUME_PROMPT_CHARS:]]))
+        region = audio[round(start * SAMPLE_RATE):round(end * SAMPLE_RATE)]
+        segments, _ = run_model(model, region, prompt or None, start, batch_size=batch_size)
+        for segment in segments:
+            tail.append(segment["text"])
+            yield segment
+    yield from kept[position:]
+
+
+def transcribe_chunks(
+    audio,
+    initial_prompt: str | None,
+    offset: float,
+    args: argparse.Namespace,
+    timings: list[float],
+) -> tuple[Iterator[dict], SimpleNamespace]:
+    # Chunks are cut in VAD silences, so no utterance spans two workers. Each chunk still starts
+    # without the previous chunk's text, so only the prompt file carries context across the cut.
+    bounds = split_at_silences(audio, args.chunk_workers)
+    pool = ProcessPoolExecutor(
+        args.chunk_workers, initializer=_init_worker, initargs=model_args(args, args.chunk_workers))
+    # Workers map cached PCM themselves instead of receiving a pickled copy of their chunk;
+    # a resumed run's audio is a view that starts at the checkpoint, hence the base position
+    pcm = getattr(audio, "filename", None)
+    base = round(offset * SAMPLE_RATE)
+    try:
+        futures = [
+            pool.submit(
+                _transcribe_chunk,
+                (Path(pcm), base + start, base + end) if pcm else audio[start:end],
+                initial_prompt,
+                offset + start / SAMPLE_RATE,
+                args.batch_size,
+            )
+            for start, end in bounds
+        ]
+        _, first_info, _ = futures[0].result()
+        info = SimpleNamespace(
+            language=first_info.language,
+            language_probability=first_info.language_probability,
+            duration=len(audio) / SAMPLE_RATE,
+        )
+    except BaseException:
+        pool.shutdown(cancel_futures=True)
+        raise
+
+    def segments() -> Iterator[dict]:
+        # Also runs when the caller fails or stops reading early, so queued chunks don't outlive it
+        try:
+            for future in futures:
+                chunk_segments, _, elapsed = future.result()
+                timings.append(elapsed)
+                yield from chunk_segments
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    return segments(), info
+
 
-    markdown: list[str] = []
-    for paragraph in group_segments(segments, args.paragraph_seconds):
-        timestamp = format_timestamp(paragraph["start"])
-        url = f"https://www.youtube.com/watch?v={args.video_id}&t={round(paragraph['start'])}s"
-        markdown.append(f"[{timestamp}]({url})")
-        markdown.append(paragraph["text"])
-        markdown.append("")
-    args.output.with_suffix(".md").write_text(
-        "\n".join(markdown),
-        encoding="utf-8",
-        newline="\n",
+def transcribe(get_model: Callable[[], WhisperModel], job: Job, args: argparse.Namespace) -> bool:
+    metrics = Metrics(job.video_id, args.metrics)
+    metrics.values.update(videoId=job.video_id, input=str(job.input), model=args.model, cached=False)
+    initial_prompt = job.prompt_file.read_text(encoding="utf-8") if job.prompt_file else None
+    cache = Cache(args.cache_dir, args.cache_max_size) if args.cache_dir is not None else None
+    audio = str(job.input)
+    if cache is not None or args.chunk_workers > 1 or args.incremental:
+        with metrics.stage("decode"):
+            audio = load_audio(job.input, cache)
+    fingerprint = None
+    if args.incremental:
+        import audio_fingerprint
+
+        with metrics.stage("fingerprint"):
+            fingerprint = audio_fingerprint.fingerprint(audio)
+    key = None
+    if cache is not None:
+        with metrics.stage("cacheLookup"):
+            key = cache_key(audio, args, initial_prompt)
+            entry = cache.get_transcript(key)
+            try:
+                # Every output reads this one handle, so another process evicting the entry can't cut the hit short
+                hit = entry.open(encoding="utf-8") if entry is not None else None
+            except FileNotFoundError:
+                hit = None
+        if hit is not None:
+            with hit:
+                header = {**next(read_records(hit)), "input": str(job.input), "videoId": job.video_id}
+                job.output.parent.mkdir(parents=True, exist_ok=True)
+                write_outputs(job, header, lambda: islice(read_records(hit), 1, None), args, metrics)
+            write_fingerprint(job, fingerprint)
+            metrics.values.update(cached=True, audioSeconds=header["duration"])
+            metrics.write(job.output.with_suffix(".metrics.json"))
+            return True
+
+    sidecar = sidecar_path(job)
+    checkpoint = read_checkpoint(sidecar) if args.resume else None
+    offset = 0.0
+    if checkpoint is not None:
+        if isinstance(audio, str):
+            with metrics.stage("decode"):
+                audio = load_audio(job.input, cache)
+        if mismatched := checkpoint_mismatches(checkpoint.header, job, args, len(audio) / SAMPLE_RATE):
+            print(
+                f"warning: {sidecar} was written for a different {', '.join(mismatched)}; starting from scratch",
+                file=sys.stderr,
+            )
+            checkpoint = None
+    if checkpoint is not None:
+        # Restart decoding right after the last committed segment; its text stands in for
+        # the context condition_on_previous_text would have carried over
+        offset = checkpoint.end
+        audio = audio[round(offset * SAMPLE_RATE):]
+        initial_prompt = " ".join(filter(None, [initial_prompt, checkpoint.tail_text]))
+    previous = read_previous(job, args.model) if fingerprint is not None and checkpoint is None else None
+    if args.chunk_workers == 1 and previous is None:
+        with metrics.stage("modelLoad"):
+            model = get_model()
+    started = time.perf_counter()
+    chunk_timings: list[float] = []
+    if previous is not None:
+        old_header, old_segments, old_fingerprint = previous
+        duration = len(audio) / SAMPLE_RATE
+        with metrics.stage("diff"):
+            matches = audio_fingerprint.match_windows(old_fingerprint, fingerprint)
+            kept, regions = audio_fingerprint.plan_splice(
+                audio_fingerprint.unchanged_runs(matches), old_segments, duration)
+        segments = splice_segments(get_model, audio, kept, regions, initial_prompt, args.batch_size)
+        info = SimpleNamespace(
+            language=old_header["language"],
+            language_probability=old_header["languageProbability"],
+            duration=duration,
+        )
+        changed = sum(end - start for start, end in regions)
+        metrics.values.update(reusedSegments=len(kept), changedSeconds=changed)
+        print(
+            f"{job.video_id}: reusing {len(kept)} of {len(old_segments)} segments, "
+            f"re-transcribing {changed:.1f}s of {duration:.1f}s in {len(regions)} regions"
+        )
+    elif args.chunk_workers > 1:
+        with metrics.stage("chunkSetup"):
+            segments, info = transcribe_chunks(audio, initial_prompt, offset, args, chunk_timings)
+    else:
+        # WhisperModel.transcribe decodes the audio and runs VAD eagerly; only decoding itself is lazy
+        with metrics.stage("decodeVad"):
+            segments, info = run_model(model, audio, initial_prompt, offset, batch_size=args.batch_size)
+
+    job.output.parent.mkdir(parents=True, exist_ok=True)
+    if checkpoint is None:
+        header = {
+            "input": str(job.input),
+            "videoId": job.video_id,
+            "model": args.model,
+            "language": info.language,
+            "languageProbability": info.language_probability,
+            "duration": info.duration,
+        }
+        f = sidecar.open("w", encoding="utf-8", newline="\n")
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+    else:
+        header = checkpoint.header
+        os.truncate(sidecar, checkpoint.size)
+        f = sidecar.open("a", encoding="utf-8", newline="\n")
+    segment_count = 0
+    with metrics.stage("inference"), f:
+        inference_started = time.perf_counter()
+        for segment in segments:
+            f.write(json.dumps(segment, ensure_ascii=False) + "\n")
+            f.flush()
+            segment_count += 1
+            metrics.progress(segment["end"], offset, header["duration"], inference_started)
+    elapsed = time.perf_counter() - started
+    transcribed = header["duration"] - offset
+    metrics.values.update(
+        audioSeconds=transcribed,
+        segments=segment_count,
+        realTimeFactor=elapsed / transcribed if transcribed > 0 else 0.0,
     )
 
+    if chunk_timings:
+        metrics.values["chunkSeconds"] = chunk_timings
+        # Summed chunk inference estimates a sequential run; workers share the CPU, so it can overstate the speedup
+        estimated = sum(chunk_timings) / elapsed
+        print(
+            f"{job.video_id}: {len(chunk_timings)} chunks on {args.chunk_workers} workers in {elapsed:.1f}s, "
+            f"est. speedup {estimated:.2f}x vs. {sum(chunk_timings):.1f}s of chunk inference, "
+            f"parallel efficiency {estimated / args.chunk_workers:.0%}"
+        )
+        if args.compare_sequential:
+            started = time.perf_counter()
+            for _ in run_model(get_model(), audio, initial_prompt, batch_size=args.batch_size)[0]:
+                pass
+            sequential = time.perf_counter() - started
+            print(
+                f"{job.video_id}: sequential run took {sequential:.1f}s, "
+                f"speedup {sequential / elapsed:.2f}x"
+            )
+
+    write_outputs(job, header, lambda: read_sidecar_segments(sidecar), args, metrics)
+    write_fingerprint(job, fingerprint)
+    # A spliced transcript isn't exactly what a full run would produce, so it isn't cached
+    if cache is not None and previous is None:
+        cache.put_transcript(key, sidecar)
+    else:
+        sidecar.unlink()
+    metrics.write(job.output.with_suffix(".metrics.json"))
+    return False
+
+
+_get_worker_model: Callable[[], WhisperModel] | None = None
+
+
+def _init_worker(model: str, device: str, compute_type: str, cpu_threads: int, num_workers: int) -> None:
+    global _get_worker_model
+    _get_worker_model = functools.cache(
+        lambda: load_model(model, device, compute_type, cpu_threads, num_workers))
+
+
+def _warm_up_worker() -> None:
+    _get_worker_model()
+
+
+def _run_worker_job(job: Job, args: argparse.Namespace) -> tuple[float, bool]:
+    started = time.perf_counter()
+    cached = transcribe(_get_worker_model, job, args)
+    return time.perf_counter() - started, cached
+
+
+def _transcribe_chunk(
+    audio: np.ndarray | tuple[Path, int, int],
+    initial_prompt: str | None,
+    offset: float,
+    batch_size: int,
+) -> tuple[list[dict], TranscriptionInfo, float]:
+    model = _get_worker_model()  # the worker's first chunk loads it; that isn't inference time
+    started = time.perf_counter()
+    if isinstance(audio, tuple):
+        audio = map_pcm(*audio)
+    segments, info = run_model(model, audio, initial_prompt, offset, batch_size=batch_size)
+    segments = list(segments)
+    return segments, info, time.perf_counter() - started
+
+
+def run_batch(args: argparse.Namespace, jobs: list[Job], job_problems: list[list[str]] | None = None) -> int:
+    # Jobs that failed check_jobs are reported as failed, without stopping the others
+    results: list[tuple[Job, float, bool, Exception | None]] = [
+        (job, 0.0, False, InvalidJob("; ".join(problems)))
+        for job, problems in zip(jobs, job_problems or []) if problems
+    ]
+    order = {id(job): i for i, job in enumerate(jobs)}
+    jobs = [job for i, job in enumerate(jobs) if not job_problems or not job_problems[i]]
+    if args.jobs == 1:
+        get_model = functools.cache(lambda: load_model(*model_args(args)))
+        for job in jobs:
+            started = time.perf_counter()
+            cached, error = False, None
+            try:
+                cached = transcribe(get_model, job, args)
+            except Exception as e:
+                error = e
+            results.append((job, time.perf_counter() - started, cached, error))
+    else:
+        # Each worker loads its own model once
+        init_args = model_args(args, args.jobs)
+        with ProcessPoolExecutor(args.jobs, initializer=_init_worker, initargs=init_args) as pool:
+            futures = {
+                pool.submit(_run_worker_job, job, args): job
+                for job in jobs
+            }
+            for future in as_completed(futures):
+                try:
+                    results.append((futures[future], *future.result(), None))
+                except Exception as e:
+                    results.append((futures[future], 0.0, False, e))
+    results.sort(key=lambda r: order[id(r[0])])
+
+    failed = 0
+    for job, elapsed, cached, error in results:
+        failed += error is not None
+        print(format_result(job, elapsed, cached, error))
+    print(f"{len(results) - failed} succeeded, {failed} failed")
+    return 1 if failed else 0
+
+
+def format_result(job: Job, elapsed: float, cached: bool, error: Exception | None) -> str:
+    if isinstance(error, InvalidJob):
+        return f"FAILED  {job.video_id}: {error}"
+    if error is not None:
+        return f"FAILED  {job.video_id}: {type(error).__name__}: {error}"
+    source = "cached" if cached else f"{elapsed:.1f}s"
+    return f"ok      {job.video_id} ({source}) -> {job.output}"
+
+
+def parse_job_request(request: dict, server_args: argparse.Namespace) -> argparse.Namespace:
+    # Jobs use the CLI's own options; model options default to the server's and must match them
+    defaults = {name: getattr(server_args, name) for name in MODEL_OPTIONS}
+    args = parse_args(request["argv"], JobArgumentParser, defaults)
+    for name in MODEL_OPTIONS:
+        if getattr(args, name) != defaults[name]:
+            raise JobArgumentError(f"this server runs with --{name.replace('_', '-')} {defaults[name]}")
+    if args.serve is not None or args.cache_stats or args.chunk_workers > 1:
+        raise JobArgumentError("--serve, --cache-stats and --chunk-workers aren't supported in server jobs")
+    cwd = Path(request["cwd"])
+    for name in PATH_OPTIONS:
+        if (path := getattr(args, name)) is not None:
+            setattr(args, name, cwd / path)
+    return args
+
+
+def serve(args: argparse.Namespace) -> None:
+    init_args = model_args(args, args.jobs)
+    with ProcessPoolExecutor(args.jobs, initializer=_init_worker, initargs=init_args) as pool:
+        for future in [pool.submit(_warm_up_worker) for _ in range(args.jobs)]:
+            future.result()
+
+        class Handler(socketserver.StreamRequestHandler):
+            def send(self, event: str, message: str, **values) -> None:
+                line = json.dumps({"event": event, "message": message, **values}, ensure_ascii=False)
+                self.wfile.write(line.encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+            def handle(self) -> None:
+                try:
+                    job_args = parse_job_request(json.loads(self.rfile.readline()), args)
+                    jobs = read_jobs(job_args)
+                except (JobArgumentError, OSError, ValueError, KeyError) as e:
+                    self.send("rejected", f"rejected: {e}")
+                    return
+                except SystemExit:  # --help
+                    self.send("rejected", "rejected: run transcribe-video.py --help locally")
+                    return
+                job_problems, shared = check_jobs(jobs, job_args)
+                problems = describe_problems(jobs, job_problems, shared)
+                if problems and (shared or job_args.dry_run or job_args.manifest is None):
+                    self.send("rejected", "rejected: " + "; ".join(problems))
+                    return
+                if job_args.dry_run:
+                    self.send("checked", f"{len(jobs)} job(s) checked, no problems found")
+                    return
+                # As in run_batch, a manifest's invalid jobs fail on their own and the others still run
+                for job, problems in zip(jobs, job_problems):
+                    if problems:
+                        error = InvalidJob("; ".join(problems))
+                        self.send("failed", format_result(job, 0.0, False, error), videoId=job.video_id)
+                jobs = [job for job, problems in zip(jobs, job_problems) if not problems]
+                futures = {pool.submit(_run_worker_job, job, job_args): job for job in jobs}
+                for job in jobs:
+                    self.send("accepted", f"queued  {job.video_id}", videoId=job.video_id)
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        elapsed, cached = future.result()
+                        message = format_result(job, elapsed, cached, None)
+                        self.send("completed", message, videoId=job.video_id, elapsed=elapsed, cached=cached)
+                    except Exception as e:
+                        self.send("failed", format_result(job, 0.0, False, e), videoId=job.video_id)
+
+        args.serve.unlink(missing_ok=True)
+        with socketserver.ThreadingUnixStreamServer(str(args.serve), Handler) as server:
+            print(f"Serving {args.model} with {args.jobs} worker(s) on {args.serve}", flush=True)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                args.serve.unlink(missing_ok=True)
+
+
+def read_jobs(args: argparse.Namespace) -> list[Job]:
+    if args.manifest is not None:
+        return read_manifest(args.manifest)
+    return [Job(args.input, args.video_id, args.output, args.prompt_file)]
+
+
+def main() -> None:
+    args = parse_args()
+    if args.serve is not None:
+        serve(args)
+        return
+    if args.cache_stats:
+        cache = Cache(args.cache_dir, args.cache_max_size)
+        if evicted := cache.evict():
+            print(f"Evicted {evicted} least recently used entries")
+        cache.print_stats()
+        return
+
+    started = time.perf_counter()
+    try:
+        jobs = read_jobs(args)
+    except (OSError, ValueError) as e:
+        sys.exit(f"error: can't read manifest: {e}")
+    job_problems, shared = check_jobs(jobs, args)
+    problems = describe_problems(jobs, job_problems, shared)
+    for problem in problems:
+        print(f"error: {problem}", file=sys.stderr)
+    if args.dry_run:
+        elapsed = time.perf_counter() - started
+        print(f"{len(jobs)} job(s) checked in {elapsed * 1000:.1f} ms, {len(problems)} problem(s)")
+        sys.exit(1 if problems else 0)
+    # One bad manifest job fails on its own in the summary; a single job or a shared problem stops the run
+    if shared or (problems and args.manifest is None):
+        sys.exit(2)
+    if args.manifest is not None:
+        sys.exit(run_batch(args, jobs, job_problems))
+    transcribe(lambda: load_model(*model_args(args)), jobs[0], args)
+
 
 if __name__ == "__main__":
     main()
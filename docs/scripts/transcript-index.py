@@ -0,0 +1,178 @@
+import argparse
+import json
+import sqlite3
+import struct
+import sys
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from compact_transcript import SUFFIX as COMPACT_SUFFIX, CompactTranscript
+
+SCHEMA = """
+create table if not exists documents (
+    id integer primary key,
+    path text not null unique,
+    video_id text not null,
+    size integer not null,
+    mtime_ns integer not null
+);
+create virtual table if not exists segments using fts5(
+    text,
+    video_id unindexed,
+    start unindexed,
+    tokenize = 'porter unicode61'
+);
+"""
+# Segment rowids are (document id << SEGMENT_BITS) + segment index, so a document's
+# segments can be replaced with a rowid range delete instead of a full table scan
+SEGMENT_BITS = 24
+METRICS_SUFFIX = ".metrics.json"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", type=Path, default=Path("transcripts.sqlite"))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update = commands.add_parser("update")
+    update.add_argument("paths", type=Path, nargs="+")
+
+    query = commands.add_parser("query")
+    query.add_argument("text")
+    query.add_argument("--limit", type=int, default=20)
+    query.add_argument("--raw", action="store_true", help="pass text through as an FTS5 query instead of a phrase")
+    query.add_argument("--json", action="store_true")
+    return parser.parse_args()
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def superseded(path: Path) -> bool:
+    # transcribe-video --format both writes each transcript twice; the compact file is indexed
+    return path.suffix == ".json" and path.with_suffix(COMPACT_SUFFIX).exists()
+
+
+def find_transcripts(paths: list[Path]) -> Iterator[Path]:
+    for path in paths:
+        if path.is_dir():
+            yield from (p for p in path.rglob("*.json") if not p.name.endswith(METRICS_SUFFIX) and not superseded(p))
+            yield from path.rglob(f"*{COMPACT_SUFFIX}")
+        elif not superseded(path):
+            yield path
+
+
+def read_transcript(path: Path) -> tuple[str, list[dict]]:
+    """The video id and segments of a transcript; raises ValueError for any other file."""
+    if path.suffix == COMPACT_SUFFIX:
+        try:
+            with CompactTranscript(path) as transcript:
+                return transcript.header["videoId"], list(transcript)
+        except (KeyError, IndexError, TypeError, struct.error) as e:
+            raise ValueError(f"not a compact transcript ({type(e).__name__}: {e})") from e
+    # A JSONDecodeError or UnicodeDecodeError is a ValueError too
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(payload, dict) or not isinstance(payload.get("segments"), list) or "videoId" not in payload:
+        raise ValueError("no videoId or segments")
+    segments = payload["segments"]
+    if not all(isinstance(s, dict) and isinstance(s.get("text"), str) and "start" in s for s in segments):
+        raise ValueError("segments without text or start")
+    return payload["videoId"], segments
+
+
+def delete_segments(connection: sqlite3.Connection, document_id: int) -> None:
+    connection.execute(
+        "delete from segments where rowid >= ? and rowid < ?",
+        (document_id << SEGMENT_BITS, (document_id + 1) << SEGMENT_BITS),
+    )
+
+
+def update(connection: sqlite3.Connection, paths: list[Path]) -> None:
+    known = {
+        path: (document_id, size, mtime_ns)
+        for document_id, path, size, mtime_ns in connection.execute(
+            "select id, path, size, mtime_ns from documents")
+    }
+    indexed = skipped = removed = 0
+    with connection:
+        for path in find_transcripts(paths):
+            key = str(path.resolve())
+            stat = path.stat()
+            document_id, size, mtime_ns = known.get(key, (None, None, None))
+            if (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                skipped += 1
+                continue
+            try:
+                video_id, segments = read_transcript(path)
+            except ValueError as e:
+                # Other JSON files are recorded without segments, so they aren't parsed again until they change
+                print(f"warning: skipping {path}: {e}", file=sys.stderr)
+                video_id, segments = "", []
+            if document_id is None:
+                document_id = connection.execute(
+                    "insert into documents (path, video_id, size, mtime_ns) values (?, ?, ?, ?)",
+                    (key, video_id, stat.st_size, stat.st_mtime_ns),
+                ).lastrowid
+            else:
+                delete_segments(connection, document_id)
+                connection.execute(
+                    "update documents set video_id = ?, size = ?, mtime_ns = ? where id = ?",
+                    (video_id, stat.st_size, stat.st_mtime_ns, document_id),
+                )
+            base = document_id << SEGMENT_BITS
+            connection.executemany(
+                "insert into segments (rowid, text, video_id, start) values (?, ?, ?, ?)",
+                ((base + i, s["text"], video_id, s["start"]) for i, s in enumerate(segments)),
+            )
+            indexed += bool(video_id)
+        for key, (document_id, _, _) in known.items():
+            if not Path(key).exists() or superseded(Path(key)):
+                delete_segments(connection, document_id)
+                connection.execute("delete from documents where id = ?", (document_id,))
+                removed += 1
+    print(f"Indexed {indexed}, unchanged {skipped}, removed {removed}")
+
+
+def query(connection: sqlite3.Connection, text: str, limit: int, raw: bool) -> list[dict]:
+    # Phrases are matched within a single segment, so a phrase spanning a segment boundary isn't found
+    match = text if raw else '"' + text.replace('"', '""') + '"'
+    rows = connection.execute(
+        "select video_id, start, snippet(segments, 0, '[', ']', '...', 12) from segments"
+        " where segments match ? order by rank limit ?",
+        (match, limit),
+    )
+    return [
+        {
+            "videoId": video_id,
+            "start": start,
+            "url": f"https://www.youtube.com/watch?v={video_id}&t={round(start)}s",
+            "snippet": snippet,
+        }
+        for video_id, start, snippet in rows
+    ]
+
+
+def main() -> None:
+    args = parse_args()
+    connection = connect(args.index)
+    if args.command == "update":
+        update(connection, args.paths)
+        return
+
+    started = time.perf_counter()
+    results = query(connection, args.text, args.limit, args.raw)
+    elapsed = time.perf_counter() - started
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    for result in results:
+        print(f"{result['url']}  {result['snippet']}")
+    print(f"{len(results)} results in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()